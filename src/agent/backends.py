@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class ChatBackend(ABC):
+    """
+    A family of chat models. create() returns an object with an invoke(messages)
+    method whose result has a `content` string (and optionally `usage_metadata`),
+    which is all ItineraryBuilder relies on.
+
+    A model name is resolved either explicitly as "<backend>:<model>" or by the
+    `prefixes` its name starts with.
+    """
+
+    name = None
+    prefixes = ()
+    api_key_env = None
+
+    def matches(self, model):
+        return model.startswith(self.prefixes)
+
+    def resolve_api_key(self, api_key):
+        if api_key is None and self.api_key_env:
+            return os.getenv(self.api_key_env)
+        return api_key
+
+    @abstractmethod
+    def create(self, model, api_key=None, temperature=0, **options):
+        pass
+
+
+BACKENDS = {}
+
+
+def register_backend(backend):
+    """
+    Register a ChatBackend (class or instance) under its name, usable as a class
+    decorator. A class that doesn't implement create() fails here.
+    """
+    instance = backend() if isinstance(backend, type) else backend
+    BACKENDS[instance.name] = instance
+    return backend
+
+
+def get_backend(model):
+    """Backend and bare model name for "<backend>:<model>" or a known model prefix"""
+    name, sep, rest = model.partition(":")
+    if sep and name in BACKENDS:
+        return BACKENDS[name], rest
+    for backend in BACKENDS.values():
+        if backend.matches(model):
+            return backend, model
+    raise ValueError(f"Model not supported: {model} (backends: {', '.join(sorted(BACKENDS))})")
+
+
+@register_backend
+class GeminiBackend(ChatBackend):
+    name = "gemini"
+    prefixes = ("gemini",)
+    api_key_env = "GEMINI_API_KEY"
+
+    def create(self, model, api_key=None, temperature=0, **options):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(model=model, google_api_key=api_key, temperature=temperature, **options)
+
+
+@register_backend
+class OpenAIBackend(ChatBackend):
+    name = "openai"
+    prefixes = ("gpt-", "o1", "o3", "o4")
+    api_key_env = "OPENAI_API_KEY"
+
+    def create(self, model, api_key=None, temperature=0, **options):
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=model, api_key=api_key, temperature=temperature, **options)
+
+
+@register_backend
+class AnthropicBackend(ChatBackend):
+    name = "anthropic"
+    prefixes = ("claude",)
+    api_key_env = "ANTHROPIC_API_KEY"
+
+    def create(self, model, api_key=None, temperature=0, **options):
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(model=model, api_key=api_key, temperature=temperature, **options)
+
+
+@register_backend
+class OllamaBackend(ChatBackend):
+    """Local models served by Ollama, e.g. "ollama:llama3.1"; no API key"""
+
+    name = "ollama"
+
+    def matches(self, model):
+        return False
+
+    def create(self, model, api_key=None, temperature=0, **options):
+        from langchain_ollama import ChatOllama
+
+        return ChatOllama(model=model, temperature=temperature, **options)
+
+
+class ChatResponse():
+    """Minimal stand-in for a langchain AIMessage"""
+
+    def __init__(self, content, usage_metadata=None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+    def __repr__(self):
+        return f"ChatResponse(content={self.content[:40]!r})"
+
+
+# Landmarks the stub routes through, by city mentioned in the query
+STUB_CITIES = {
+    "krakow": ("Krakow, Poland", [
+        "Wawel Royal Castle", "Planty Park", "Main Market Square", "St. Mary's Basilica",
+        "Collegium Maius", "Florian's Gate", "Kazimierz Synagogue", "Bernatek Footbridge",
+    ]),
+    "milan": ("Milan, Italy", [
+        "Arco della Pace", "Parco Sempione", "Castello Sforzesco", "Piazza del Duomo",
+        "Brera Academy", "Giardini Indro Montanelli", "Porta Nuova", "Navigli",
+    ]),
+    "paris": ("Paris, France", [
+        "Eiffel Tower", "Champ de Mars", "Pont Alexandre III", "Tuileries Garden",
+        "Louvre Museum", "Pont Neuf", "Luxembourg Gardens", "Pantheon",
+    ]),
+}
+DEFAULT_STUB_CITY = "krakow"
+
+
+class StubChatModel():
+    """
+    Deterministic offline chat model answering the ValidationTemplate,
+    ItinearyDesignTemplate and MappingTemplate prompts with responses their parsers
+    accept. The same query always produces the same itinerary (landmarks of the city
+    mentioned in the query, picked from a hash of the query), so it can stand in for
+    a hosted model in load tests.
+
+    `latency` seconds (plus up to `jitter`, from a seeded generator) are slept per
+    call to mimic a remote model.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, n_waypoints=4, invalid_keywords=("harm",)):
+        self.latency = latency
+        self.jitter = jitter
+        self.n_waypoints = n_waypoints
+        self.invalid_keywords = invalid_keywords
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if not self.latency and not self.jitter:
+            return
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        time.sleep(delay)
+
+    @staticmethod
+    def _delimited(text):
+        """Text between the four-hashtag delimiters of the human message"""
+        match = re.search(r"####\$?(.*?)####", text, re.S)
+        return (match.group(1) if match else text).strip()
+
+    def _validate(self, query):
+        valid = bool(query) and not any(k in query.lower() for k in self.invalid_keywords)
+        return json.dumps({
+            "plan_is_valid": "yes" if valid else "no",
+            "updated_request": "" if valid else "A 5km run in Krakow starting and ending at Wawel Royal Castle.",
+        })
+
+    def _itinerary(self, query):
+        city = next((c for c in STUB_CITIES if c in query.lower()), DEFAULT_STUB_CITY)
+        _, landmarks = STUB_CITIES[city]
+        start = int(hashlib.sha256(query.encode()).hexdigest(), 16) % len(landmarks)
+        stops = [landmarks[(start + i) % len(landmarks)] for i in range(self.n_waypoints + 1)]
+        lines = [f"- Begin your run at **{stops[0]}**."]
+        lines += [f"- Continue to **{stop}**." for stop in stops[1:]]
+        lines.append(f"- Finish back at **{stops[0]}**.")
+        return "\n".join(lines)
+
+    def _mapping(self, suggestion):
+        stops = re.findall(r"\*\*(.+?)\*\*", suggestion)
+        location = next(
+            (loc for loc, landmarks in STUB_CITIES.values() if stops and stops[0] in landmarks),
+            STUB_CITIES[DEFAULT_STUB_CITY][0],
+        )
+        stops = [f"{stop}, {location}" for stop in stops] or [location]
+        return json.dumps({"start": stops[0], "end": stops[-1], "waypoints": stops[1:-1]})
+
+    def invoke(self, messages):
+        self._sleep()
+        system = " ".join(m.content for m in messages if getattr(m, "type", None) == "system")
+        human = self._delimited(" ".join(m.content for m in messages if getattr(m, "type", None) != "system"))
+
+        if "plan_is_valid" in system:
+            content = self._validate(human)
+        elif "geocodable" in system:
+            content = self._mapping(human)
+        else:
+            content = self._itinerary(human)
+
+        prompt = system + human
+        return ChatResponse(content, {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        })
+
+
+@register_backend
+class StubBackend(ChatBackend):
+    """
+    "stub" or "stub:<anything>", options are passed to StubChatModel
+    (latency, jitter, seed, n_waypoints)
+    """
+
+    name = "stub"
+    prefixes = ("stub",)
+
+    def create(self, model, api_key=None, temperature=0, **options):
+        return StubChatModel(**options)
@@ -2,43 +2,62 @@
 import os
 import logging
 
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-
 from time import time
 
-from src.agent.templates import ValidationTemplate, ItinearyDesignTemplate, MappingTemplate
-from src.base.itinerary import Itinerary
 from src.base.itinerary import Itinerary, UnfeasibleItinerary
+from src.telemetry import tracing
 
 
 
 
 class ItineraryBuilder(object):
-    def __init__(self, api_key, model, temperature=0, debug=True):
+    def __init__(self, api_key, model, temperature=0, debug=True, chat_model=None, backend_options=None):
         
         
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
         
-        if "gemini" in model:
-            self.logger.info("using Google Gemini Model")
-            self.chat_model = ChatGoogleGenerativeAI(
-                model=model,
-                google_api_key=api_key,
-                temperature=temperature
+        # langchain and the model SDKs are slow to import, only load them when a builder is created
+        from src.agent.templates import ValidationTemplate, ItinearyDesignTemplate, MappingTemplate
+
+        if chat_model is not None:
+            # Any object with an invoke(messages) method, e.g. a replayed model in benchmarks
+            self.chat_model = chat_model
+        else:
+            # "gemini-...", "gpt-...", "claude-...", "stub" or explicit "<backend>:<model>", see backends.py
+            from src.agent.backends import get_backend
+
+            backend, model_name = get_backend(model)
+            self.logger.info(f"using {backend.name} backend for {model_name}")
+            self.chat_model = backend.create(
+                model_name,
+                backend.resolve_api_key(api_key),
+                temperature,
+                **(backend_options or {})
                 # TODO: tune other parameters
             )
-        # TODO: add other models (openAI, palm2, etc)
-        else:
-            raise ValueError("Model not supported")
         
         self.api_key = api_key
+        self.model = model
 
         self.validation_prompt = ValidationTemplate()
         self.itinerary_prompt = ItinearyDesignTemplate()
         self.mapping_prompt = MappingTemplate()
     
+    def _invoke(self, stage, messages):
+        """Call the chat model inside a span, counting calls and tokens"""
+        with tracing.span(f"agent.{stage}", model=self.model) as span:
+            response = self.chat_model.invoke(messages)
+            tracing.count("llm_calls", stage=stage, model=self.model)
+
+            usage = getattr(response, "usage_metadata", None) or {}
+            for kind in ("input_tokens", "output_tokens"):
+                if kind in usage:
+                    span.set_attribute(kind, usage[kind])
+                    tracing.count("llm_tokens", usage[kind], kind=kind, model=self.model)
+        return response
+
+    @tracing.traced("agent.request_itinerary")
     def request_running_itinerary(self, query):
         # TODO add starting point as input parameter
 
@@ -50,7 +69,7 @@ class ItineraryBuilder(object):
             query=query,
             format_instructions=self.validation_prompt.parser.get_format_instructions(),
         )
-        validation_response = self.chat_model.invoke(validation_messages)
+        validation_response = self._invoke("validate", validation_messages)
         validation_text = getattr(validation_response, "content", str(validation_response))
         validation_test = self.validation_prompt.parser.parse(validation_text)
         t2 = time()
@@ -67,7 +86,7 @@ class ItineraryBuilder(object):
         t1 = time()
         # Step 1: Produce narrated itinerary suggestion
         itinerary_messages = self.itinerary_prompt().format_messages(query=query)
-        itinerary_response = self.chat_model.invoke(itinerary_messages)
+        itinerary_response = self._invoke("itinerary", itinerary_messages)
         agent_suggestion = getattr(itinerary_response, "content", str(itinerary_response))
 
         # Step 2: Map narrated itinerary to structured start/end/waypoints JSON
@@ -75,7 +94,7 @@ class ItineraryBuilder(object):
             agent_suggestion=agent_suggestion,
             format_instructions=self.mapping_prompt.parser.get_format_instructions(),
         )
-        mapping_response = self.chat_model.invoke(mapping_messages)
+        mapping_response = self._invoke("mapping", mapping_messages)
         mapping_text = getattr(mapping_response, "content", str(mapping_response))
         t2 = time()
         self.logger.info("Time to generate itinerary: {}".format(round(t2 - t1, 2)))
@@ -95,6 +114,8 @@ class ItineraryBuilder(object):
         
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
@@ -0,0 +1,34 @@
+from math import asin, cos, radians, sin, sqrt
+
+
+# Mean earth radius (IUGG)
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    """Great-circle distance in meters between two points given in degrees"""
+    lon1, lat1, lon2, lat2 = map(radians, (lon1, lat1, lon2, lat2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(a))
+
+
+def segment_lengths(coords):
+    """Great-circle length in meters of each edge of a [lon, lat, ...] polyline"""
+    # numpy is only needed by the vectorized helpers, keep importing this module cheap
+    import numpy as np
+
+    arr = np.radians(np.asarray(coords, dtype=float)[:, :2])
+    lon, lat = arr[:, 0], arr[:, 1]
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def to_meters(points, lat0):
+    """Local equirectangular projection of (lon, lat) degrees to meters, accurate at city scale"""
+    import numpy as np
+
+    points = np.radians(np.asarray(points, dtype=float)[:, :2])
+    return np.column_stack((
+        points[:, 0] * np.cos(np.radians(lat0)) * EARTH_RADIUS_M,
+        points[:, 1] * EARTH_RADIUS_M,
+    ))
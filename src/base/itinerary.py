@@ -9,18 +9,33 @@ class Itinerary():
     
     def __repr__(self):
         return f"Itinerary(start={self.start}, end={self.end}, waypoints={self.waypoints}"
+
+    def to_dict(self):
+        return {
+            "start": self.start,
+            "end": self.end,
+            "waypoints": self.waypoints,
+            "itinerary": self.itinerary,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["start"], data["end"], data["waypoints"], data.get("itinerary"))
     
     def __str__(self):
         return f"Itinerary from {self.start} to {self.end} via {self.waypoints}\nItinerary: {self.itinerary}"
 
 class UnfeasibleItinerary(Itinerary):
     def __init__(self, updated_request):
-        super().__init__(None, None, None)
+        super().__init__(None, None, None, None)
         self.feasible = False
         self.updated_request = updated_request
 
     def __repr__(self):
         return f"UnfeasibleItinerary(updated_request={self.updated_request})"
+
+    def to_dict(self):
+        return {"feasible": False, "updated_request": self.updated_request}
     
     def __str__(self):
         return f"Unfeasible Itinerary. Suggested update to request: {self.updated_request}"
@@ -1,18 +1,22 @@
 
-from src.base.route_features import Surface, Steepness, Greenness, Noisiness, Shadowness
+import json
 
-import gpxpy
-import gpxpy.gpx
+from src.base.route_features import Surface, Steepness, Greenness, Noisiness, Shadowness
+from src.telemetry import tracing
 
 class Route():
 
     def __init__(self, json_data):
-        self._parse_json(json_data)
+        with tracing.span("route.parse") as span:
+            self._parse_json(json_data)
+            span.set_attribute("vertices", len(self.route_coords))
 
 
     
     def _parse_json(self, json_data):
 
+        # Kept to re-serialize / hash the route (batch export, caching)
+        self.json_data = json_data
 
         # TODO: complexer class?
         self.route_coords = json_data['geometry']['coordinates'] 
@@ -53,7 +57,7 @@ class Route():
         if "surface" in json_data["properties"]["extras"].keys():
             self.surface = Surface(json_data["properties"]["extras"]["surface"])
 
-        self.surface
+        self.steepness = None
         if "steepness" in json_data["properties"]["extras"].keys():
             self.steepness = Steepness(json_data["properties"]["extras"]["steepness"])
 
@@ -77,9 +81,31 @@ class Route():
         return self.shadowness.get_shadowness()
     
 
-    def save_gpx(self, filename="out/itinerary.gpx"):
+    @classmethod
+    def load_json(cls, filename):
+        with open(filename) as f:
+            return cls(json.load(f))
+
+    def save_json(self, filename="out/route.json"):
+        with open(filename, "w") as f:
+            json.dump(self.json_data, f)
+
+    def splits(self, split_length=1000.0, target_pace=None, target_time=None):
+        """Per-km (or split_length meters) splits with grade-adjusted paces, see PacePlan"""
+        from src.route.splits import PacePlan
+        return PacePlan(self, split_length, target_pace, target_time)
+
+    @tracing.traced("route.gpx")
+    def to_gpx(self, splits=None):
+        """GPX track; with a PacePlan, every split end is added as a waypoint (course point on watches)"""
+        import gpxpy.gpx
 
         gpx = gpxpy.gpx.GPX()
+        if splits is not None:
+            for lon, lat, elevation, name, description in splits.waypoints():
+                gpx.waypoints.append(gpxpy.gpx.GPXWaypoint(
+                    lat, lon, elevation=elevation, name=name, description=description, symbol="Flag", type="split",
+                ))
         gpx_track = gpxpy.gpx.GPXTrack()
         gpx.tracks.append(gpx_track)
         gpx_segment = gpxpy.gpx.GPXTrackSegment()
@@ -93,8 +119,11 @@ class Route():
             for lon, lat, elevation in self.route_coords:
                 gpx_segment.points.append(gpxpy.gpx.GPXTrackPoint(lat, lon, elevation=elevation))
 
+        return gpx.to_xml()
+
+    def save_gpx(self, filename="out/itinerary.gpx", splits=None):
         with open(filename, "w") as f:
-            f.write(gpx.to_xml())
+            f.write(self.to_gpx(splits))
 
 
 
@@ -25,7 +25,7 @@ class SurfaceType(Enum):
     GRASS_PAVER = 18
 
     def __str__(self):
-        return f"{self.name.replace("_", " ").title()}"
+        return f"{self.name.replace('_', ' ').title()}"
 
 
 class SteepnessType(Enum):
@@ -141,9 +141,10 @@ class SimplifiedTopographicFeature(TopographicFeature):
         
         self._parse_json(json_data)
 
+        # Summary amounts are percentages, so the average stays on the 0-10 gauge scale
         self.average = 0
         for value in self.summary:
-            self.average += value * self.summary[value]["percent"]
+            self.average += value * self.summary[value]["percent"] / 100
         self.average = round(self.average, 2)
 
  
@@ -0,0 +1,280 @@
+import json
+import logging
+import math
+import os
+import random
+import statistics
+from time import perf_counter
+
+from src.bench.transport import Fixture, RecordingChatModel, RecordingORSClient, ReplayChatModel, ReplayORSClient
+
+
+OUTLIER_SIZES = (5, 10, 25, 50, 100, 250, 500)
+
+
+def synthetic_feature(n_vertices=2000, seed=0, start=(19.935, 50.054)):
+    """
+    Deterministic ORS-like GeoJSON feature (random walk with elevation and
+    surface/steepness/green extras) used when no recorded directions are available.
+    """
+    rnd = random.Random(seed)
+    lon, lat = start
+    elevation = 210.0
+    coords = []
+    for _ in range(n_vertices):
+        coords.append([round(lon, 6), round(lat, 6), round(elevation, 1)])
+        lon += rnd.uniform(-1, 1) * 1e-4
+        lat += rnd.uniform(-1, 1) * 1e-4
+        elevation += rnd.uniform(-0.5, 0.5)
+
+    def intervals(values):
+        out, i = [], 0
+        while i < n_vertices - 1:
+            j = min(n_vertices - 1, i + rnd.randint(5, 60))
+            out.append([i, j, rnd.choice(values)])
+            i = j
+        return out
+
+    def summary(values):
+        amounts = {}
+        for start, end, value in values:
+            amounts[value] = amounts.get(value, 0) + end - start
+        total = sum(amounts.values())
+        return [{"value": v, "distance": a, "amount": round(100 * a / total, 2)} for v, a in amounts.items()]
+
+    extras = {}
+    for key, values in (("surface", [1, 3, 5, 11, 14]), ("steepness", [-2, -1, 0, 1, 2]), ("green", [2, 5, 8])):
+        vals = intervals(values)
+        extras[key] = {"values": vals, "summary": summary(vals)}
+
+    lons = [c[0] for c in coords]
+    lats = [c[1] for c in coords]
+    eles = [c[2] for c in coords]
+    return {
+        "type": "Feature",
+        "bbox": [min(lons), min(lats), min(eles), max(lons), max(lats), max(eles)],
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "properties": {
+            "summary": {"distance": n_vertices * 8.0, "duration": n_vertices * 6.0},
+            "ascent": 50.0,
+            "descent": 50.0,
+            "way_points": [0, n_vertices - 1],
+            "extras": extras,
+        },
+    }
+
+
+def synthetic_coords(n, seed=0, outlier_ratio=0.05):
+    """Geocoded-like (lon, lat) points around a city center, a few of them far away"""
+    rnd = random.Random(seed)
+    coords = [(19.935 + rnd.gauss(0, 0.01), 50.054 + rnd.gauss(0, 0.01)) for _ in range(n)]
+    for i in rnd.sample(range(n), max(1, int(n * outlier_ratio))):
+        coords[i] = (coords[i][0] + rnd.choice([-1, 1]) * 2, coords[i][1] + 1)
+    return coords
+
+
+def timeit(fn, repeat=5, warmup=1):
+    """Run fn warmup + repeat times, returns timing statistics in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        samples.append((perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)], 3),
+        "min_ms": round(samples[0], 3),
+        "repeat": repeat,
+    }
+
+
+class BenchmarkSuite():
+    """
+    Stage-level and end-to-end benchmarks running fully offline. Recorded fixtures
+    (see record()) provide the ORS and chat-model responses, replayed with a
+    configurable artificial latency; stages that only need a route fall back to a
+    synthetic one when no fixture is given.
+    """
+
+    def __init__(self, fixture=None, latency=0.0, jitter=0.0, repeat=5):
+        self.fixture = fixture
+        self.latency = latency
+        self.jitter = jitter
+        self.repeat = repeat
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.INFO)
+
+    def _features(self):
+        """Recorded directions features, or a synthetic one"""
+        features = []
+        if self.fixture is not None:
+            for key, response in self.fixture.ors.items():
+                if key.startswith("directions:"):
+                    features.extend(response.get("features", []))
+        return features or [synthetic_feature()]
+
+    def _planner(self):
+        from src.route.planner import RoutePlanner
+        return RoutePlanner(ors_api_key=None, client=ReplayORSClient(self.fixture, self.latency, self.jitter))
+
+    def bench_outliers(self):
+        from src.route.planner import RoutePlanner
+
+        planner = RoutePlanner(ors_api_key=None, client=object())
+        results = {}
+        for n in OUTLIER_SIZES:
+            coords = synthetic_coords(n)
+            # Quadratic stage, keep the large sizes from dominating the suite
+            repeat = self.repeat if n <= 100 else max(1, self.repeat // 2)
+            results[f"outliers.n{n}"] = timeit(lambda: planner._detect_outliers_mad(coords), repeat)
+        return results
+
+    def bench_route_parse(self):
+        from src.base.route import Route
+
+        features = self._features()
+        return {"route.parse": timeit(lambda: [Route(f) for f in features], self.repeat)}
+
+    def bench_gpx(self):
+        from src.base.route import Route
+
+        routes = [Route(f) for f in self._features()]
+        return {"route.gpx": timeit(lambda: [r.to_gpx() for r in routes], self.repeat)}
+
+    def bench_map(self):
+        from src.base.route import Route
+        from src.visualize.visualizer import RouteVisualizer
+
+        routes = [Route(f) for f in self._features()]
+
+        def render(compact):
+            for route in routes:
+                visualizer = RouteVisualizer(route, compact=compact)
+                visualizer.create_map()
+                visualizer.to_html()
+
+        return {
+            "map.render": timeit(lambda: render(False), self.repeat),
+            "map.render_compact": timeit(lambda: render(True), self.repeat),
+        }
+
+    def bench_pipeline(self):
+        if self.fixture is None or not self.fixture.chat or "query" not in self.fixture.meta:
+            self.logger.info("Skipping pipeline benchmarks: no recorded fixture")
+            return {}
+
+        from src.agent.builder import ItineraryBuilder
+        from src.visualize.visualizer import RouteVisualizer
+
+        query = self.fixture.meta["query"]
+        model = self.fixture.meta.get("model", "replay")
+        builder = ItineraryBuilder(
+            api_key=None, model=model,
+            chat_model=ReplayChatModel(self.fixture, self.latency, self.jitter),
+        )
+
+        def geocode_and_route():
+            planner = self._planner()
+            itinerary = builder.request_running_itinerary(query)
+            return planner.create_route(itinerary, save_gpx=False)
+
+        def full():
+            route = geocode_and_route()
+            route.to_gpx()
+            visualizer = RouteVisualizer(route)
+            visualizer.create_map()
+            visualizer.to_html()
+
+        return {
+            "pipeline.itinerary": timeit(lambda: builder.request_running_itinerary(query), self.repeat),
+            "pipeline.full": timeit(full, self.repeat),
+        }
+
+    def run(self, stages=None):
+        benchmarks = {
+            "outliers": self.bench_outliers,
+            "parse": self.bench_route_parse,
+            "gpx": self.bench_gpx,
+            "map": self.bench_map,
+            "pipeline": self.bench_pipeline,
+        }
+        results = {}
+        for stage in stages or benchmarks:
+            self.logger.info(f"Running {stage} benchmarks")
+            results.update(benchmarks[stage]())
+        return results
+
+
+def record(query, ors_api_key, path, model="gemini-2.5-flash"):
+    """
+    Run the live pipeline once and store every ORS and chat-model response in a
+    fixture. The model backend reads its own API key from the environment.
+    """
+    from src.agent.builder import ItineraryBuilder
+    from src.route.planner import RoutePlanner
+
+    fixture = Fixture(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fixture.meta = {"query": query, "model": model}
+
+    builder = ItineraryBuilder(api_key=None, model=model, temperature=0, debug=False)
+    builder.chat_model = RecordingChatModel(builder.chat_model, fixture)
+    planner = RoutePlanner(ors_api_key=ors_api_key)
+    planner.ors = RecordingORSClient(planner.ors, fixture)
+
+    itinerary = builder.request_running_itinerary(query)
+    if itinerary.feasible:
+        planner.create_route(itinerary, save_gpx=False)
+    fixture.save()
+    return fixture
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare medians against a stored baseline. Returns one row per benchmark with the
+    ratio to the baseline and a status: "regression" when slower than
+    baseline * (1 + tolerance), "improvement" when faster than baseline / (1 + tolerance).
+    """
+    rows = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append({"name": name, "median_ms": stats["median_ms"], "baseline_ms": None, "ratio": None, "status": "new"})
+            continue
+        ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({
+            "name": name,
+            "median_ms": stats["median_ms"],
+            "baseline_ms": base["median_ms"],
+            "ratio": round(ratio, 3),
+            "status": status,
+        })
+    return rows
+
+
+def format_report(rows):
+    lines = [f"{'benchmark':28} {'median ms':>10} {'baseline':>10} {'ratio':>7}  status"]
+    for row in rows:
+        baseline = f"{row['baseline_ms']:.3f}" if row["baseline_ms"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        lines.append(f"{row['name']:28} {row['median_ms']:>10.3f} {baseline:>10} {ratio:>7}  {row['status']}")
+    return "\n".join(lines)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
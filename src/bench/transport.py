@@ -0,0 +1,143 @@
+import hashlib
+import json
+import random
+import threading
+import time
+
+from src.agent.backends import ChatResponse
+from src.route.singleflight import canonical_key
+
+
+class Fixture():
+    """
+    Recorded ORS and chat-model responses, stored as one JSON file:
+    {"meta": {...}, "ors": {key: response}, "chat": {key: {"content", "usage_metadata"}}}
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.meta = {}
+        self.ors = {}
+        self.chat = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        fixture = cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        fixture.meta = data.get("meta", {})
+        fixture.ors = data.get("ors", {})
+        fixture.chat = data.get("chat", {})
+        return fixture
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            data = {"meta": self.meta, "ors": self.ors, "chat": self.chat}
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    def record(self, kind, key, value):
+        with self._lock:
+            getattr(self, kind)[key] = value
+
+
+def chat_key(messages):
+    """Key of a chat request: hash of the role and content of every message"""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(getattr(message, "type", type(message).__name__).encode())
+        digest.update(b"\0")
+        digest.update(str(getattr(message, "content", message)).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _Latency():
+    """Artificial latency: a fixed delay plus seeded uniform jitter, so runs are repeatable"""
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        if not self.latency and not self.jitter:
+            return
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        time.sleep(delay)
+
+
+class RecordingORSClient():
+    """Wraps a live openrouteservice.Client and records every response into a fixture"""
+
+    def __init__(self, client, fixture):
+        self.client = client
+        self.fixture = fixture
+
+    def pelias_search(self, **params):
+        response = self.client.pelias_search(**params)
+        self.fixture.record("ors", canonical_key("pelias_search", params), response)
+        return response
+
+    def directions(self, **params):
+        response = self.client.directions(**params)
+        self.fixture.record("ors", canonical_key("directions", params), response)
+        return response
+
+
+class ReplayORSClient():
+    """Serves recorded ORS responses offline, with optional artificial latency"""
+
+    def __init__(self, fixture, latency=0.0, jitter=0.0, seed=0):
+        self.fixture = fixture
+        self._latency = _Latency(latency, jitter, seed)
+
+    def _replay(self, key):
+        self._latency.sleep()
+        try:
+            return self.fixture.ors[key]
+        except KeyError:
+            raise KeyError(f"No recorded ORS response for {key}")
+
+    def pelias_search(self, **params):
+        return self._replay(canonical_key("pelias_search", params))
+
+    def directions(self, **params):
+        return self._replay(canonical_key("directions", params))
+
+
+class RecordingChatModel():
+    """Wraps a live chat model and records every response into a fixture"""
+
+    def __init__(self, chat_model, fixture):
+        self.chat_model = chat_model
+        self.fixture = fixture
+
+    def invoke(self, messages):
+        response = self.chat_model.invoke(messages)
+        self.fixture.record("chat", chat_key(messages), {
+            "content": getattr(response, "content", str(response)),
+            "usage_metadata": dict(getattr(response, "usage_metadata", None) or {}),
+        })
+        return response
+
+
+class ReplayChatModel():
+    """Serves recorded chat responses offline, with optional artificial latency"""
+
+    def __init__(self, fixture, latency=0.0, jitter=0.0, seed=0):
+        self.fixture = fixture
+        self._latency = _Latency(latency, jitter, seed)
+
+    def invoke(self, messages):
+        self._latency.sleep()
+        key = chat_key(messages)
+        try:
+            recorded = self.fixture.chat[key]
+        except KeyError:
+            raise KeyError(f"No recorded chat response for {key}")
+        return ChatResponse(recorded["content"], recorded.get("usage_metadata"))
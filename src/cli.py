@@ -0,0 +1,269 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from src.telemetry import tracing
+from src.telemetry.exporters import JsonLinesExporter, PrometheusExporter
+
+
+DEFAULT_QUERY = "I want to do a nice 5km run in Krakow, starting from the castle going through the old town and the university district, and ending back at the castle. I prefer scenic routes with some historical landmarks along the way."
+
+# Modules that must not be loaded just by importing the CLI, each stage imports what it needs
+HEAVY_MODULES = ("langchain", "langchain_google_genai", "pydantic", "openrouteservice", "folium", "gpxpy", "numpy")
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def _load_env():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def _render(route, out_dir, compact=False, inline=False, segments=False):
+    from src.visualize.visualizer import RouteVisualizer
+
+    visualizer = RouteVisualizer(route, compact=compact)
+    visualizer.create_map(segments=segments)
+    visualizer.save(os.path.join(out_dir, "map.html"), inline=inline)
+
+
+def _route(itinerary, args):
+    from src.route.planner import RoutePlanner
+
+    planner = RoutePlanner(ors_api_key=os.getenv("ORS_API_KEY"))
+    route = planner.create_route(itinerary, filename=os.path.join(args.out_dir, "itinerary.gpx"))
+    route.save_json(os.path.join(args.out_dir, "route.json"))
+
+    if not args.no_map:
+        _render(route, args.out_dir, args.compact, args.inline, args.segments)
+    return route
+
+
+def cmd_plan(args):
+    from src.agent.builder import ItineraryBuilder
+
+    logger = logging.getLogger(__name__)
+    _load_env()
+
+    # The backend reads its own key (GEMINI_API_KEY, OPENAI_API_KEY, ...) from the environment
+    agent = ItineraryBuilder(api_key=None, model=args.model, temperature=0, debug=False)
+    suggested_itinerary = agent.request_running_itinerary(args.query)
+
+    if suggested_itinerary.feasible is False:
+        logger.error("The provided running plan is not feasible.")
+        logger.info(f"Suggested update to request: {suggested_itinerary.updated_request}")
+        return 1
+
+    print(suggested_itinerary)
+
+    with open(os.path.join(args.out_dir, "itinerary.json"), "w") as f:
+        json.dump(suggested_itinerary.to_dict(), f, indent=2)
+
+    _route(suggested_itinerary, args)
+    return 0
+
+
+def cmd_route(args):
+    from src.base.itinerary import Itinerary
+
+    _load_env()
+    with open(args.itinerary) as f:
+        itinerary = Itinerary.from_dict(json.load(f))
+
+    route = _route(itinerary, args)
+    print(f"Route of {route.distance / 1000:.2f} km saved to {args.out_dir}")
+    return 0
+
+
+def cmd_render(args):
+    from src.base.route import Route
+
+    route = Route.load_json(args.route)
+    if args.gpx:
+        route.save_gpx(os.path.join(args.out_dir, "itinerary.gpx"))
+    _render(route, args.out_dir, args.compact, args.inline, args.segments)
+    return 0
+
+
+def cmd_splits(args):
+    from src.base.route import Route
+
+    route = Route.load_json(args.route)
+    plan = route.splits(args.length, target_pace=args.pace, target_time=args.time)
+    print(plan)
+
+    with open(os.path.join(args.out_dir, "splits.json"), "w") as f:
+        json.dump(plan.to_dict(), f, indent=2)
+    if args.gpx:
+        route.save_gpx(os.path.join(args.out_dir, "itinerary.gpx"), splits=plan)
+    return 0
+
+
+def cmd_import(args):
+    from src.importers.archive import iter_activities
+
+    if args.save:
+        os.makedirs(os.path.join(args.out_dir, "activities"), exist_ok=True)
+
+    n = 0
+    for n, route in enumerate(iter_activities(args.path, args.elevation_threshold, args.min_spacing), 1):
+        properties = route.json_data["properties"]
+        print(f"{properties['source']}: {properties['name'] or '-'}, {route.distance / 1000:.2f} km, "
+              f"+{getattr(route, 'total_ascent', 0):.0f} m, {len(route.route_coords)} points")
+        if args.save:
+            route.save_json(os.path.join(args.out_dir, "activities", f"{n:05d}.json"))
+    print(f"Imported {n} activities")
+    return 0
+
+
+def measure_import_time(module="src.cli"):
+    """Import `module` in a fresh interpreter, returns (seconds, heavy modules it pulled in)"""
+    code = (
+        "import sys, time\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - t)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    seconds, loaded = out.stdout.splitlines()
+    return float(seconds), [m for m in loaded.split(",") if m]
+
+
+def cmd_check_imports(args):
+    ok = True
+    for module in args.modules:
+        seconds, loaded = measure_import_time(module)
+        within_budget = seconds <= args.budget and not loaded
+        ok &= within_budget
+        status = "ok" if within_budget else "FAIL"
+        heavy = f", loaded {', '.join(loaded)}" if loaded else ""
+        print(f"{status:4} {module}: {seconds * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms){heavy}")
+    return 0 if ok else 1
+
+
+def cmd_bench(args):
+    from src.bench.suite import BenchmarkSuite, compare, format_report, load_baseline, save_baseline
+    from src.bench.transport import Fixture
+
+    fixture = Fixture.load(args.fixture) if args.fixture else None
+    suite = BenchmarkSuite(fixture, latency=args.latency, jitter=args.jitter, repeat=args.repeat)
+    results = suite.run(args.stages or None)
+
+    baseline = load_baseline(args.baseline) if args.baseline and os.path.exists(args.baseline) else {}
+    rows = compare(results, baseline, args.tolerance)
+    print(format_report(rows))
+
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def cmd_bench_record(args):
+    from src.bench.suite import record
+
+    _load_env()
+    fixture = record(args.query, os.getenv("ORS_API_KEY"), args.output, args.model)
+    print(f"Recorded {len(fixture.chat)} chat and {len(fixture.ors)} ORS responses to {args.output}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="runscape", description="AI generated running routes")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("--trace", metavar="FILE", help="write spans and metrics as JSON lines")
+    parser.add_argument("--metrics", metavar="FILE", help="write metrics in Prometheus text format")
+    subparsers = parser.add_subparsers(dest="command")
+
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--out-dir", default="out")
+    output.add_argument("--compact", action="store_true", help="embed geometry as encoded polylines")
+    output.add_argument("--inline", action="store_true", help="inline JS/CSS assets in the map")
+    output.add_argument("--segments", action="store_true", help="add surface and steepness layers to the map")
+
+    plan = subparsers.add_parser("plan", parents=[output], help="query -> itinerary -> route -> map")
+    plan.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    plan.add_argument("--model", default="gemini-2.5-flash", help='e.g. gemini-2.5-flash, gpt-4o, "ollama:llama3.1" or "stub" (offline)')
+    plan.add_argument("--no-map", action="store_true")
+    plan.set_defaults(func=cmd_plan)
+
+    route = subparsers.add_parser("route", parents=[output], help="saved itinerary JSON -> route -> map")
+    route.add_argument("itinerary")
+    route.add_argument("--no-map", action="store_true")
+    route.set_defaults(func=cmd_route)
+
+    render = subparsers.add_parser("render", parents=[output], help="saved route JSON -> map")
+    render.add_argument("route")
+    render.add_argument("--gpx", action="store_true", help="also write the GPX")
+    render.set_defaults(func=cmd_render)
+
+    check = subparsers.add_parser("check-imports", help="check the import-time budget of the CLI modules")
+    check.add_argument("--budget", type=float, default=0.2, help="seconds per module")
+    check.add_argument("modules", nargs="*", default=[
+        "src.cli", "src.agent.builder", "src.route.planner", "src.base.route",
+    ])
+    check.set_defaults(func=cmd_check_imports)
+
+    splits = subparsers.add_parser("splits", parents=[output], help="saved route JSON -> per-km splits and pace plan")
+    splits.add_argument("route")
+    splits.add_argument("--length", type=float, default=1000.0, help="split length in meters")
+    splits.add_argument("--pace", default=None, help='flat target pace, "m:ss" per km')
+    splits.add_argument("--time", type=float, default=None, help="target time in seconds, overrides --pace")
+    splits.add_argument("--gpx", action="store_true", help="write the GPX with a waypoint per split")
+    splits.set_defaults(func=cmd_splits)
+
+    importer = subparsers.add_parser("import", parents=[output], help="import GPX/FIT activities (file, directory or .zip)")
+    importer.add_argument("path")
+    importer.add_argument("--save", action="store_true", help="write each activity as route JSON to OUT_DIR/activities")
+    importer.add_argument("--elevation-threshold", type=float, default=2.0, help="ascent hysteresis in meters")
+    importer.add_argument("--min-spacing", type=float, default=0.0, help="drop points closer than this (meters)")
+    importer.set_defaults(func=cmd_import)
+
+    bench = subparsers.add_parser("bench", help="run the offline benchmark suite")
+    bench.add_argument("--fixture", help="recorded responses from bench-record")
+    bench.add_argument("--stages", nargs="*", choices=["outliers", "parse", "gpx", "map", "pipeline"])
+    bench.add_argument("--latency", type=float, default=0.0, help="artificial seconds per replayed call")
+    bench.add_argument("--jitter", type=float, default=0.0, help="extra uniform random seconds per call")
+    bench.add_argument("--repeat", type=int, default=5)
+    bench.add_argument("--baseline", help="baseline JSON to compare against")
+    bench.add_argument("--save-baseline", metavar="FILE", help="store these results as a baseline")
+    bench.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    bench.add_argument("--fail-on-regression", action="store_true")
+    bench.set_defaults(func=cmd_bench)
+
+    record = subparsers.add_parser("bench-record", help="record live ORS/model responses for the benchmarks")
+    record.add_argument("query", nargs="?", default=DEFAULT_QUERY)
+    record.add_argument("--model", default="gemini-2.5-flash")
+    record.add_argument("-o", "--output", default="bench/fixture.json")
+    record.set_defaults(func=cmd_bench_record)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Plain `python main.py` keeps running the example query
+        args = parser.parse_args(list(sys.argv[1:] if argv is None else argv) + ["plan"])
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    if hasattr(args, "out_dir"):
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    telemetry = tracing.get_telemetry()
+    if args.trace:
+        telemetry.add_exporter(JsonLinesExporter(args.trace))
+    if args.metrics:
+        telemetry.add_exporter(PrometheusExporter(args.metrics))
+
+    try:
+        with tracing.span(f"cli.{args.command or 'plan'}"):
+            return args.func(args)
+    finally:
+        telemetry.flush()
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+
+from src.base.route import Route
+
+
+# Bump when GPX/map rendering changes in a way that should invalidate exported files
+EXPORT_VERSION = 1
+
+MANIFEST_NAME = "manifest.json"
+# Route fingerprints of the last deduplicated export, so unchanged routes aren't parsed again
+FINGERPRINTS_NAME = "fingerprints.json"
+
+COMBINED_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#17becf"]
+
+
+class ExportSettings():
+
+    def __init__(self, gpx=True, html=True, compact=False, segments=False, inline=False, zoom_start=14):
+        self.gpx = gpx
+        self.html = html
+        self.compact = compact
+        self.segments = segments
+        self.inline = inline
+        self.zoom_start = zoom_start
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"ExportSettings({self.to_dict()})"
+
+
+def content_hash(feature, settings):
+    """Hash of a route feature together with the export settings that produced its files"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(feature, sort_keys=True, separators=(",", ":")).encode())
+    digest.update(json.dumps({**settings.to_dict(), "version": EXPORT_VERSION}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _output_paths(out_dir, route_id, settings):
+    paths = []
+    if settings.gpx:
+        paths.append(os.path.join(out_dir, f"{route_id}.gpx"))
+    if settings.html:
+        paths.append(os.path.join(out_dir, f"{route_id}.html"))
+    return paths
+
+
+def _export_chunk(chunk, out_dir, settings_dict):
+    """Worker: render one chunk of (route_id, feature) pairs, returns (route_id, error) pairs"""
+    settings = ExportSettings(**settings_dict)
+    results = []
+    for route_id, feature in chunk:
+        try:
+            route = Route(feature)
+            if settings.gpx:
+                route.save_gpx(os.path.join(out_dir, f"{route_id}.gpx"))
+            if settings.html:
+                # Imported here so GPX-only exports don't pay for folium in every worker
+                from src.visualize.visualizer import RouteVisualizer
+                visualizer = RouteVisualizer(route, compact=settings.compact)
+                visualizer.create_map(zoom_start=settings.zoom_start, segments=settings.segments)
+                visualizer.save(os.path.join(out_dir, f"{route_id}.html"), inline=settings.inline)
+            results.append((route_id, None))
+        except Exception as e:
+            results.append((route_id, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class BatchExporter():
+    """
+    Regenerate GPX and HTML artifacts for a collection of routes on a process pool.
+
+    Routes are given as a mapping (or iterable of pairs) of route_id -> Route or ORS
+    GeoJSON feature. A manifest in out_dir stores the content hash of each exported
+    route, so routes whose feature and settings did not change are skipped.
+    """
+
+    def __init__(self, out_dir="out/batch", settings=None, max_workers=None, chunk_size=16):
+        self.out_dir = out_dir
+        self.settings = settings or ExportSettings()
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.INFO)
+
+    def _load(self, name):
+        path = os.path.join(self.out_dir, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save(self, name, data, indent=1):
+        path = os.path.join(self.out_dir, name)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=indent, sort_keys=True)
+        os.replace(tmp, path)
+
+    def export(self, routes, force=False, dedup_threshold=None):
+        """
+        Export every route, returns a report with counts, failures and throughput.
+
+        With dedup_threshold (meters), routes whose geometry is within that Fréchet
+        distance of an earlier route are not exported; the report maps each of them
+        to the route_id that represents it. Fingerprints are cached next to the
+        manifest, so only new or changed routes are parsed for deduplication.
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        items = routes.items() if isinstance(routes, dict) else routes
+        manifest = self._load(MANIFEST_NAME)
+
+        index = None
+        if dedup_threshold is not None:
+            from src.route.similarity import RouteFingerprint, RouteIndex
+            index = RouteIndex()
+            cached_fingerprints, fingerprints = self._load(FINGERPRINTS_NAME), {}
+
+        start = time()
+        pending, hashes, skipped, duplicates = [], {}, 0, {}
+        for route_id, route in items:
+            route_id = str(route_id)
+            feature = route.json_data if isinstance(route, Route) else route
+            digest = content_hash(feature, self.settings)
+            if index is not None:
+                cached = cached_fingerprints.get(route_id)
+                if cached is not None and cached["hash"] == digest:
+                    fingerprint = RouteFingerprint.from_dict(cached)
+                else:
+                    fingerprint = index.fingerprint(route if isinstance(route, Route) else Route(route))
+                fingerprints[route_id] = {**fingerprint.to_dict(), "hash": digest}
+                key, added = index.add_unique(feature, key=route_id, threshold=dedup_threshold, fingerprint=fingerprint)
+                if not added:
+                    duplicates[route_id] = key
+                    continue
+            outputs_exist = all(os.path.exists(p) for p in _output_paths(self.out_dir, route_id, self.settings))
+            if not force and manifest.get(route_id) == digest and outputs_exist:
+                skipped += 1
+                continue
+            hashes[route_id] = digest
+            pending.append((route_id, feature))
+
+        if index is not None:
+            self._save(FINGERPRINTS_NAME, fingerprints, indent=None)
+
+        total = len(pending) + skipped + len(duplicates)
+        self.logger.info(f"Exporting {len(pending)} route(s), {skipped} unchanged, {len(duplicates)} duplicate(s)")
+
+        chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+        done, failed = 0, {}
+        if chunks:
+            settings_dict = self.settings.to_dict()
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(_export_chunk, chunk, self.out_dir, settings_dict) for chunk in chunks]
+                for future in as_completed(futures):
+                    for route_id, error in future.result():
+                        done += 1
+                        if error is None:
+                            manifest[route_id] = hashes[route_id]
+                        else:
+                            failed[route_id] = error
+                            manifest.pop(route_id, None)
+                    elapsed = time() - start
+                    self.logger.info(
+                        f"Exported {done}/{len(pending)} ({done / elapsed:.1f} routes/s, {len(failed)} failed)"
+                    )
+            self._save(MANIFEST_NAME, manifest)
+
+        elapsed = time() - start
+        report = {
+            "total": total,
+            "exported": done - len(failed),
+            "skipped": skipped,
+            "duplicates": duplicates,
+            "failed": failed,
+            "elapsed": round(elapsed, 3),
+            "throughput": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+        self.logger.info(
+            f"Batch export done: {report['exported']} exported, {skipped} skipped, "
+            f"{len(failed)} failed in {report['elapsed']}s"
+        )
+        return report
+
+    def export_combined_map(self, routes, filename="combined.html"):
+        """Single map with one toggleable layer per route"""
+        import folium
+        from src.visualize.polyline import EncodedPolyLine
+
+        line_cls = EncodedPolyLine if self.settings.compact else folium.PolyLine
+        items = routes.items() if isinstance(routes, dict) else routes
+        combined = None
+        bounds = []
+        for i, (route_id, route) in enumerate(items):
+            route = route if isinstance(route, Route) else Route(route)
+            points = [[lat, lon] for lon, lat, *_ in route.route_coords]
+            if combined is None:
+                combined = folium.Map(location=points[0], zoom_start=self.settings.zoom_start)
+
+            group = folium.FeatureGroup(name=str(route_id))
+            line_cls(
+                points,
+                color=COMBINED_COLORS[i % len(COMBINED_COLORS)],
+                weight=3,
+                opacity=0.9,
+                popup=f"{route_id}: {route.distance / 1000:.2f} km",
+            ).add_to(group)
+            group.add_to(combined)
+            lats, lons = [p[0] for p in points], [p[1] for p in points]
+            bounds.append([[min(lats), min(lons)], [max(lats), max(lons)]])
+
+        if combined is None:
+            raise ValueError("No routes to export")
+
+        combined.fit_bounds([
+            [min(b[0][0] for b in bounds), min(b[0][1] for b in bounds)],
+            [max(b[1][0] for b in bounds), max(b[1][1] for b in bounds)],
+        ])
+        folium.LayerControl(collapsed=True).add_to(combined)
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, filename)
+        if self.settings.inline:
+            from src.visualize.visualizer import inline_assets
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(inline_assets(combined.get_root().render()))
+        else:
+            combined.save(path)
+        return path
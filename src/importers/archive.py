@@ -0,0 +1,68 @@
+import gzip
+import logging
+import os
+import zipfile
+
+from src.importers.fit import FitError, iter_fit_routes
+from src.importers.gpx import iter_gpx_routes
+
+
+FORMATS = {".gpx": iter_gpx_routes, ".fit": iter_fit_routes}
+
+
+def _format(filename):
+    """Importer for a file name, looking through a .gz suffix; None if unsupported"""
+    name = filename.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return FORMATS.get(os.path.splitext(name)[1])
+
+
+def _open(stream, filename):
+    return gzip.GzipFile(fileobj=stream, mode="rb") if filename.lower().endswith(".gz") else stream
+
+
+def _iter_paths(path):
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                yield os.path.join(root, filename)
+    else:
+        yield path
+
+
+def iter_activities(path, elevation_threshold=2.0, min_spacing=0.0):
+    """
+    Stream every activity under `path` as Route objects: a single .gpx/.fit file
+    (optionally .gz compressed), a directory, or a .zip archive such as a full
+    account export. Files are decompressed and parsed on the fly one at a time, so
+    archives of any size are processed with bounded memory; unreadable files are
+    logged and skipped.
+    """
+    logger = logging.getLogger(__name__)
+    options = {"elevation_threshold": elevation_threshold, "min_spacing": min_spacing}
+
+    for filename in _iter_paths(path):
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(filename) as archive:
+                for member in archive.infolist():
+                    importer = _format(member.filename)
+                    if importer is None or member.is_dir():
+                        continue
+                    with archive.open(member) as stream:
+                        yield from _import(importer, _open(stream, member.filename), member.filename, options, logger)
+            continue
+
+        importer = _format(filename)
+        if importer is None:
+            continue
+        with open(filename, "rb") as stream:
+            yield from _import(importer, _open(stream, filename), filename, options, logger)
+
+
+def _import(importer, stream, name, options, logger):
+    try:
+        yield from importer(stream, name=name, **options)
+    except (FitError, EOFError, OSError, SyntaxError) as e:
+        # ParseError is a SyntaxError; a corrupt file shouldn't stop a whole archive
+        logger.warning(f"Skipping {name}: {e}")
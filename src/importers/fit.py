@@ -0,0 +1,188 @@
+import struct
+from datetime import datetime, timedelta, timezone
+
+from src.importers.track import TrackBuilder
+from src.telemetry import tracing
+
+
+FIT_EPOCH = datetime(1989, 12, 31, tzinfo=timezone.utc)
+SEMICIRCLES = 180 / 2 ** 31
+
+RECORD_MESSAGE = 20
+EVENT_MESSAGE = 21
+
+# Field numbers of the record message
+TIMESTAMP, LAT, LON, ALTITUDE, ENHANCED_ALTITUDE = 253, 0, 1, 2, 78
+# Field numbers and values of the event message marking a timer stop
+EVENT, EVENT_TYPE = 0, 1
+TIMER_EVENT, STOP_EVENT_TYPES = 0, (1, 4)
+
+# Base type -> (struct format, invalid value), only the types the record fields use
+BASE_TYPES = {
+    0x00: ("B", 0xFF),
+    0x84: ("H", 0xFFFF),
+    0x85: ("i", 0x7FFFFFFF),
+    0x86: ("I", 0xFFFFFFFF),
+    0x8C: ("I", 0x00000000),
+}
+
+
+class FitError(ValueError):
+    pass
+
+
+class _Definition():
+
+    def __init__(self, global_number, endian, fields, size):
+        self.global_number = global_number
+        self.endian = endian
+        self.fields = fields  # [(number, offset, size, base type)]
+        self.size = size
+
+    def decode(self, data, wanted):
+        values = {}
+        for number, offset, size, base_type in self.fields:
+            if number not in wanted or base_type not in BASE_TYPES:
+                continue
+            fmt, invalid = BASE_TYPES[base_type]
+            if struct.calcsize(fmt) != size:
+                continue
+            value = struct.unpack_from(self.endian + fmt, data, offset)[0]
+            if value != invalid:
+                values[number] = value
+        return values
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise FitError("Truncated FIT file")
+    return data
+
+
+def _read_definition(stream, header):
+    architecture = _read(stream, 2)[1]
+    endian = ">" if architecture else "<"
+    global_number, n_fields = struct.unpack(endian + "HB", _read(stream, 3))
+    raw = _read(stream, 3 * n_fields)
+
+    fields, offset = [], 0
+    for i in range(n_fields):
+        number, size, base_type = raw[3 * i:3 * i + 3]
+        fields.append((number, offset, size, base_type))
+        offset += size
+
+    consumed = 5 + 3 * n_fields
+    if header & 0x20:  # developer fields: only their size matters
+        n_dev = _read(stream, 1)[0]
+        dev = _read(stream, 3 * n_dev)
+        offset += sum(dev[3 * i + 1] for i in range(n_dev))
+        consumed += 1 + 3 * n_dev
+    return _Definition(global_number, endian, fields, offset), consumed
+
+
+def _iter_records(stream, data_size):
+    """Decoded record messages of one FIT file: dicts with time, lat, lon and altitude"""
+    definitions = {}
+    last_timestamp = None
+    wanted = (TIMESTAMP, LAT, LON, ALTITUDE, ENHANCED_ALTITUDE)
+    remaining = data_size
+
+    while remaining > 0:
+        header = _read(stream, 1)[0]
+        remaining -= 1
+
+        if header & 0x80:  # compressed timestamp header, always a data message
+            local_type = (header >> 5) & 0x03
+            time_offset = header & 0x1F
+        elif header & 0x40:
+            definitions[header & 0x0F], consumed = _read_definition(stream, header)
+            remaining -= consumed
+            continue
+        else:
+            local_type = header & 0x0F
+            time_offset = None
+
+        definition = definitions.get(local_type)
+        if definition is None:
+            raise FitError(f"Data message for undefined local type {local_type}")
+        data = _read(stream, definition.size)
+        remaining -= definition.size
+
+        if definition.global_number == EVENT_MESSAGE:
+            event = definition.decode(data, (EVENT, EVENT_TYPE))
+            if event.get(EVENT) == TIMER_EVENT and event.get(EVENT_TYPE) in STOP_EVENT_TYPES:
+                yield None  # timer paused: a gap in the track
+            continue
+        if definition.global_number != RECORD_MESSAGE:
+            continue
+
+        values = definition.decode(data, wanted)
+        if TIMESTAMP in values:
+            last_timestamp = values[TIMESTAMP]
+        elif time_offset is not None and last_timestamp is not None:
+            timestamp = (last_timestamp & ~0x1F) + time_offset
+            if time_offset < (last_timestamp & 0x1F):
+                timestamp += 0x20
+            last_timestamp = timestamp
+
+        if LAT not in values or LON not in values:
+            continue
+        if ENHANCED_ALTITUDE in values:
+            altitude = values[ENHANCED_ALTITUDE] / 5 - 500
+        elif ALTITUDE in values:
+            altitude = values[ALTITUDE] / 5 - 500
+        else:
+            altitude = None
+        yield {
+            "lat": values[LAT] * SEMICIRCLES,
+            "lon": values[LON] * SEMICIRCLES,
+            "ele": altitude,
+            "time": FIT_EPOCH + timedelta(seconds=last_timestamp) if last_timestamp is not None else None,
+        }
+
+
+def iter_fit_routes(source, name=None, elevation_threshold=2.0, min_spacing=0.0):
+    """
+    Stream the activities of a FIT file (one per chained FIT file, usually one) as
+    Route objects. `source` is a path or a binary file object, read sequentially
+    message by message, so memory is bounded by the activity being built.
+
+    Only the record messages (position, altitude, time) are decoded; timer stop
+    events split the track so pauses don't count towards the distance.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        with open(source, "rb") as f:
+            yield from iter_fit_routes(f, name or str(source), elevation_threshold, min_spacing)
+        return
+
+    name = name or getattr(source, "name", "fit")
+    n_files = 0
+
+    while True:
+        size = source.read(1)
+        if not size:
+            return
+        header = size + _read(source, size[0] - 1)
+        if len(header) < 12 or header[8:12] != b".FIT":
+            raise FitError(f"{name} is not a FIT file")
+        data_size = struct.unpack_from("<I", header, 4)[0]
+
+        n_files += 1
+        track = TrackBuilder(
+            source=f"{name}#{n_files}",
+            elevation_threshold=elevation_threshold,
+            min_spacing=min_spacing,
+        )
+        for record in _iter_records(source, data_size):
+            if record is None:
+                track.break_segment()
+            else:
+                track.add(record["lon"], record["lat"], record["ele"], record["time"])
+        _read(source, 2)  # file CRC
+
+        route = track.to_route()
+        if route is None:
+            continue
+        tracing.count("activities_imported", format="fit")
+        yield route
@@ -0,0 +1,95 @@
+import logging
+import xml.etree.ElementTree as ET
+
+from src.importers.track import TrackBuilder, parse_time
+from src.telemetry import tracing
+
+
+TRACK_TAGS = ("trk", "rte")
+POINT_TAGS = ("trkpt", "rtept")
+
+
+def _local(tag):
+    """Tag name without its namespace: GPX 1.0 and 1.1 files use different ones"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_gpx_routes(source, name=None, elevation_threshold=2.0, min_spacing=0.0):
+    """
+    Stream the tracks (<trk>) and routes (<rte>) of a GPX file as Route objects.
+
+    `source` is a path or a binary file object. The file is parsed incrementally and
+    every point is discarded from the XML tree once it has been added to the track
+    being built, so memory is bounded by the largest single track, not by the size
+    of the file.
+    """
+    logger = logging.getLogger(__name__)
+    name = name or getattr(source, "name", source)
+
+    stack = []
+    tags = []
+    local_tags = {}
+    track = None
+    point = None
+    n_tracks = 0
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = local_tags.get(elem.tag)
+        if tag is None:
+            tag = local_tags[elem.tag] = _local(elem.tag)
+
+        if event == "start":
+            stack.append(elem)
+            tags.append(tag)
+            if tag in TRACK_TAGS:
+                n_tracks += 1
+                track = TrackBuilder(
+                    source=f"{name}#{n_tracks}",
+                    elevation_threshold=elevation_threshold,
+                    min_spacing=min_spacing,
+                )
+            elif tag in POINT_TAGS and track is not None:
+                try:
+                    point = {"lat": float(elem.get("lat")), "lon": float(elem.get("lon")), "ele": None, "time": None}
+                except (TypeError, ValueError):
+                    logger.warning(f"Skipping point without valid coordinates in {name}")
+                    point = None
+            continue
+
+        stack.pop()
+        tags.pop()
+        parent = tags[-1] if tags else None
+
+        if point is not None and parent in POINT_TAGS:
+            if tag == "ele":
+                try:
+                    point["ele"] = float(elem.text)
+                except (TypeError, ValueError):
+                    pass
+            elif tag == "time":
+                point["time"] = parse_time(elem.text)
+
+        elif tag in POINT_TAGS:
+            if point is not None:
+                track.add(point["lon"], point["lat"], point["ele"], point["time"])
+                point = None
+            # Drop the finished point from the tree to keep memory constant
+            del stack[-1][-1]
+
+        elif tag == "name" and parent in TRACK_TAGS and track is not None:
+            track.name = (elem.text or "").strip() or None
+
+        elif tag == "trkseg" and track is not None:
+            track.break_segment()
+            del stack[-1][-1]
+
+        elif tag in TRACK_TAGS:
+            route = track.to_route() if track is not None else None
+            track = None
+            del stack[-1][-1]
+            if route is not None:
+                tracing.count("activities_imported", format="gpx")
+                yield route
+
+        elif tag == "wpt" and stack:
+            del stack[-1][-1]
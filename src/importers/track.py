@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime
+
+from src.base.geo import haversine_m
+from src.base.route import Route
+
+
+class TrackBuilder():
+    """
+    Accumulates the points of one recorded track and computes its distance, ascent,
+    descent and bbox on the fly, so importers never hold more than the compact
+    geometry of the track being read.
+
+    Ascent/descent use a hysteresis of `elevation_threshold` meters to ignore GPS
+    elevation noise. Points closer than `min_spacing` meters to the last kept one are
+    dropped from the geometry (they still count towards the distance). Distance is
+    not accumulated across segment breaks (GPS pauses, separate <trkseg>s).
+    """
+
+    def __init__(self, name=None, source=None, elevation_threshold=2.0, min_spacing=0.0):
+        self.name = name
+        self.source = source
+        self.elevation_threshold = elevation_threshold
+        self.min_spacing = min_spacing
+
+        self.coords = []
+        self.elevations = []
+        self.distance = 0.0
+        self.ascent = 0.0
+        self.descent = 0.0
+        self.start_time = None
+        self.end_time = None
+
+        self._last = None
+        self._kept = None
+        self._pending = None
+        self._reference_elevation = None
+
+    def add(self, lon, lat, elevation=None, time=None):
+        lon, lat = round(lon, 6), round(lat, 6)
+        if self._last is not None:
+            self.distance += haversine_m(self._last[0], self._last[1], lon, lat)
+        self._last = (lon, lat)
+
+        if elevation is not None:
+            if self._reference_elevation is None:
+                self._reference_elevation = elevation
+            delta = elevation - self._reference_elevation
+            if delta >= self.elevation_threshold:
+                self.ascent += delta
+                self._reference_elevation = elevation
+            elif delta <= -self.elevation_threshold:
+                self.descent -= delta
+                self._reference_elevation = elevation
+
+        if time is not None:
+            self.start_time = self.start_time or time
+            self.end_time = time
+
+        point = (lon, lat, elevation)
+        if self._kept is not None and self.min_spacing and \
+                haversine_m(self._kept[0], self._kept[1], lon, lat) < self.min_spacing:
+            self._pending = point
+            return
+        self._keep(point)
+
+    def _keep(self, point):
+        lon, lat, elevation = point
+        self.coords.append([lon, lat])
+        self.elevations.append(None if elevation is None else round(elevation, 1))
+        self._kept = point
+        self._pending = None
+
+    def break_segment(self):
+        """Next point starts a new segment: no distance is counted across the gap"""
+        self._last = None
+
+    def __len__(self):
+        return len(self.coords) + (self._pending is not None)
+
+    def _geometry(self):
+        if self._pending is not None:
+            self._keep(self._pending)
+
+        if all(e is None for e in self.elevations):
+            return self.coords
+
+        # Fill missing elevations with the closest previous (or first known) value
+        filled = next(e for e in self.elevations if e is not None)
+        coords = []
+        for (lon, lat), elevation in zip(self.coords, self.elevations):
+            if elevation is not None:
+                filled = elevation
+            coords.append([lon, lat, filled])
+        return coords
+
+    def to_feature(self):
+        """ORS-like GeoJSON feature, so the result goes through the regular Route parser"""
+        coords = self._geometry()
+        lons = [c[0] for c in coords]
+        lats = [c[1] for c in coords]
+        if len(coords[0]) == 3:
+            eles = [c[2] for c in coords]
+            bbox = [min(lons), min(lats), min(eles), max(lons), max(lats), max(eles)]
+        else:
+            bbox = [min(lons), min(lats), max(lons), max(lats)]
+
+        summary = {"distance": round(self.distance, 1)}
+        if self.start_time is not None and self.end_time is not None:
+            summary["duration"] = (self.end_time - self.start_time).total_seconds()
+
+        properties = {
+            "summary": summary,
+            "ascent": round(self.ascent, 1),
+            "descent": round(self.descent, 1),
+            "way_points": [0, len(coords) - 1],
+            "extras": {},
+            "name": self.name,
+            "source": self.source,
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+        }
+        return {
+            "type": "Feature",
+            "bbox": bbox,
+            "geometry": {"type": "LineString", "coordinates": coords},
+            "properties": properties,
+        }
+
+    def to_route(self):
+        """Route of the track, None for tracks with less than two points"""
+        if len(self) < 2:
+            logging.getLogger(__name__).warning(f"Skipping track {self.name or self.source}: less than two points")
+            return None
+        return Route(self.to_feature())
+
+
+def parse_time(text):
+    """ISO 8601 timestamp as found in GPX files, None if it can't be parsed"""
+    try:
+        return datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
@@ -0,0 +1,248 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from src.base.geo import segment_lengths
+from src.base.route import Route
+
+
+
+
+class WaypointEdit():
+    """
+    A single change to the ordered list of places of a plan. `index` refers to the
+    position in plan.places (0 is the start, len - 1 the end) at the moment the edit
+    is applied; edits in a diff are applied in order.
+    """
+
+    INSERT = "insert"
+    REMOVE = "remove"
+    REPLACE = "replace"
+
+    def __init__(self, op, index, place=None):
+        if op not in (self.INSERT, self.REMOVE, self.REPLACE):
+            raise ValueError(f"Unknown waypoint edit: {op}")
+        if op != self.REMOVE and place is None:
+            raise ValueError(f"A place is required to {op} a waypoint")
+        self.op = op
+        self.index = index
+        self.place = place
+
+    @classmethod
+    def insert(cls, index, place):
+        return cls(cls.INSERT, index, place)
+
+    @classmethod
+    def remove(cls, index):
+        return cls(cls.REMOVE, index)
+
+    @classmethod
+    def replace(cls, index, place):
+        return cls(cls.REPLACE, index, place)
+
+    def __repr__(self):
+        return f"WaypointEdit(op={self.op}, index={self.index}, place={self.place})"
+
+
+class RoutePlan():
+    """
+    Everything needed to re-plan a route incrementally: the ordered places, their
+    geocoded (lon, lat) coordinates and the routed GeoJSON feature, whose
+    `way_points` map each place to a vertex of the geometry.
+    """
+
+    def __init__(self, places, coords, feature):
+        if len(places) != len(coords):
+            raise ValueError("Every place needs exactly one coordinate")
+        self.places = list(places)
+        self.coords = list(coords)
+        self.feature = feature
+        self.route = Route(feature)
+
+    def __repr__(self):
+        return f"RoutePlan(places={self.places}, distance={self.route.distance})"
+
+
+def apply_edits(places, edits):
+    """
+    Apply edits to a list of places. Returns the new places and, for each of them,
+    the index it had in the original list (None for places that are new).
+    """
+    places = list(places)
+    origin = list(range(len(places)))
+    for edit in edits:
+        if edit.op == WaypointEdit.INSERT:
+            if not 0 < edit.index < len(places) + 1:
+                raise IndexError(f"Cannot insert a waypoint at position {edit.index}")
+            places.insert(edit.index, edit.place)
+            origin.insert(edit.index, None)
+        elif edit.op == WaypointEdit.REMOVE:
+            if len(places) <= 2:
+                raise ValueError("A route needs at least a start and an end")
+            del places[edit.index]
+            del origin[edit.index]
+        else:
+            places[edit.index] = edit.place
+            origin[edit.index] = None
+    return places, origin
+
+
+def dirty_runs(origin):
+    """
+    Group the legs of the edited place list that cannot be reused from the previous
+    route into maximal runs of consecutive legs. Returns (first, last) place index
+    pairs: each run is re-routed with a single directions request.
+    """
+    runs = []
+    for leg in range(len(origin) - 1):
+        a, b = origin[leg], origin[leg + 1]
+        if a is not None and b is not None and b == a + 1:
+            continue
+        if runs and runs[-1][1] == leg:
+            runs[-1] = (runs[-1][0], leg + 1)
+        else:
+            runs.append((leg, leg + 1))
+    return runs
+
+
+def _clip_intervals(values, starts, first, last):
+    """Intervals of `values` overlapping vertices [first, last], re-based at first"""
+    clipped = []
+    i = max(bisect_right(starts, first) - 1, 0)
+    while i < len(values) and values[i][0] < last:
+        start, end, value = values[i]
+        start, end = max(start, first), min(end, last)
+        if start < end:
+            clipped.append([start - first, end - first, value])
+        i += 1
+    return clipped
+
+
+def split_legs(feature):
+    """
+    Split a routed feature into one leg per pair of consecutive way points. Each leg
+    carries its own geometry slice, extras intervals (re-based at 0), distance,
+    ascent and descent, so legs from different responses can be spliced together.
+    """
+    props = feature["properties"]
+    coords = feature["geometry"]["coordinates"]
+    way_points = props["way_points"]
+    n_legs = len(way_points) - 1
+    has_elevation = len(coords[0]) == 3
+
+    segments = props.get("segments") or []
+    if len(segments) == n_legs and all("distance" in seg for seg in segments):
+        distances = [seg["distance"] for seg in segments]
+    else:
+        # No per-leg summary: split the total distance proportionally to the geometry
+        lengths = np.concatenate([[0.0], np.cumsum(segment_lengths(coords))])
+        raw = np.diff(lengths[way_points])
+        scale = props["summary"]["distance"] / raw.sum() if raw.sum() > 0 else 0.0
+        distances = (raw * scale).tolist()
+
+    if has_elevation and len(segments) == n_legs and all("ascent" in seg for seg in segments):
+        ascents = [seg["ascent"] for seg in segments]
+        descents = [seg["descent"] for seg in segments]
+    elif has_elevation:
+        # Same idea for ascent/descent: raw elevation gains scaled to the smoothed ORS totals
+        diffs = np.diff(np.asarray([c[2] for c in coords], dtype=float))
+        gain = np.concatenate([[0.0], np.cumsum(np.clip(diffs, 0, None))])
+        loss = np.concatenate([[0.0], np.cumsum(np.clip(-diffs, 0, None))])
+        raw_gain, raw_loss = np.diff(gain[way_points]), np.diff(loss[way_points])
+        gain_scale = props.get("ascent", raw_gain.sum()) / raw_gain.sum() if raw_gain.sum() > 0 else 0.0
+        loss_scale = props.get("descent", raw_loss.sum()) / raw_loss.sum() if raw_loss.sum() > 0 else 0.0
+        ascents = (raw_gain * gain_scale).tolist()
+        descents = (raw_loss * loss_scale).tolist()
+    else:
+        ascents = descents = [0.0] * n_legs
+
+    extras = props.get("extras", {})
+    starts = {key: [v[0] for v in extra.get("values", [])] for key, extra in extras.items()}
+
+    legs = []
+    for k in range(n_legs):
+        first, last = way_points[k], way_points[k + 1]
+        legs.append({
+            "coords": coords[first:last + 1],
+            "extras": {
+                key: _clip_intervals(extra.get("values", []), starts[key], first, last)
+                for key, extra in extras.items()
+            },
+            "distance": distances[k],
+            "ascent": ascents[k],
+            "descent": descents[k],
+        })
+    return legs
+
+
+def _summarize(values, lengths, total_distance):
+    """ORS-style summary ({value, distance, amount}) of a list of intervals"""
+    cumulative = np.concatenate([[0.0], np.cumsum(lengths)])
+    raw_total = cumulative[-1]
+    scale = total_distance / raw_total if raw_total > 0 else 0.0
+
+    per_value = {}
+    for start, end, value in values:
+        per_value[value] = per_value.get(value, 0.0) + float(cumulative[end] - cumulative[start]) * scale
+
+    summary = [
+        {
+            "value": value,
+            "distance": round(distance, 1),
+            "amount": round(100 * distance / total_distance, 2) if total_distance else 0.0,
+        }
+        for value, distance in per_value.items()
+    ]
+    summary.sort(key=lambda item: item["amount"], reverse=True)
+    return summary
+
+
+def splice_legs(legs):
+    """Assemble legs back into a single GeoJSON feature, the inverse of split_legs"""
+    coords = list(legs[0]["coords"])
+    way_points = [0, len(coords) - 1]
+    keys = set(legs[0]["extras"]).intersection(*(leg["extras"] for leg in legs[1:]))
+    values = {key: [] for key in keys}
+
+    offset = 0
+    for i, leg in enumerate(legs):
+        if i > 0:
+            coords.extend(leg["coords"][1:])
+            way_points.append(len(coords) - 1)
+        for key in keys:
+            merged = values[key]
+            for start, end, value in leg["extras"][key]:
+                start, end = start + offset, end + offset
+                # Merge runs of the same value across leg boundaries
+                if merged and merged[-1][2] == value and merged[-1][1] == start:
+                    merged[-1][1] = end
+                else:
+                    merged.append([start, end, value])
+        offset += len(leg["coords"]) - 1
+
+    distance = sum(leg["distance"] for leg in legs)
+    lengths = segment_lengths(coords)
+    extras = {key: {"values": values[key], "summary": _summarize(values[key], lengths, distance)} for key in keys}
+
+    arr = np.asarray(coords, dtype=float)
+    bbox = arr.min(axis=0).tolist() + arr.max(axis=0).tolist()
+
+    properties = {
+        "summary": {"distance": distance},
+        "way_points": way_points,
+        "segments": [
+            {"distance": leg["distance"], "ascent": leg["ascent"], "descent": leg["descent"]}
+            for leg in legs
+        ],
+        "extras": extras,
+    }
+    if arr.shape[1] == 3:
+        properties["ascent"] = sum(leg["ascent"] for leg in legs)
+        properties["descent"] = sum(leg["descent"] for leg in legs)
+
+    return {
+        "type": "Feature",
+        "bbox": bbox,
+        "geometry": {"type": "LineString", "coordinates": coords},
+        "properties": properties,
+    }
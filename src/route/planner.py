@@ -1,40 +1,57 @@
-import openrouteservice
-from openrouteservice import convert
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import folium
 import os
 import logging
-from dotenv import load_dotenv
-import sys
-from pathlib import Path
-
-# import
-
-current_dir = Path(__file__).resolve().parent.parent
-utilities_dir = current_dir.parent / "src"
-sys.path.append(str(utilities_dir.parent))
 
+from src.base.geo import haversine_m
 from src.base.itinerary import Itinerary
 from src.base.route import Route
+from src.route.singleflight import SingleFlight, canonical_key
+from src.telemetry import tracing
+
 
 class RoutePlanner():
-    def __init__(self, ors_api_key):
-        self.ors = openrouteservice.Client(key=ors_api_key)
+    def __init__(self, ors_api_key, client=None, route_index=None):
+        if client is not None:
+            # Anything exposing pelias_search/directions, e.g. a replayed client in benchmarks
+            self.ors = client
+        else:
+            # Heavy dependencies are imported when first needed to keep startup fast
+            import openrouteservice
+
+            self.ors = openrouteservice.Client(key=ors_api_key)
+        # Identical geocode/directions requests running concurrently share one ORS call
+        self.flights = SingleFlight()
+        # Optional RouteIndex: routes already planned through the same coordinates are reused
+        self.route_index = route_index
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
     
+    def _ors_call(self, endpoint, **params):
+        executed = []
+
+        def call():
+            executed.append(True)
+            tracing.count("ors_api_calls", endpoint=endpoint)
+            return getattr(self.ors, endpoint)(**params)
+
+        with tracing.span(f"ors.{endpoint}") as span:
+            result = self.flights.do(canonical_key(endpoint, params), call)
+            # Coalesced calls got the result of an identical in-flight request
+            span.set_attribute("coalesced", not executed)
+        if not executed:
+            tracing.count("ors_calls_coalesced", endpoint=endpoint)
+        return result
+
+    def _pelias_search(self, **params):
+        return self._ors_call("pelias_search", **params)
+
+    def _directions(self, **params):
+        return self._ors_call("directions", **params)
+
     def _haversine_km(self, coord_a, coord_b):
         """Compute great-circle distance in kilometers between two (lon, lat) tuples."""
-        from math import radians, sin, cos, asin, sqrt
-        lon1, lat1 = coord_a
-        lon2, lat2 = coord_b
-        lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * asin(sqrt(a))
-        earth_radius_km = 6371.0088
-        return earth_radius_km * c
+        return haversine_m(*coord_a, *coord_b) / 1000
 
     def _median(self, values):
         if not values:
@@ -115,68 +132,80 @@ class RoutePlanner():
             'max_lat': max(lats)
         }
 
+    def _geocode_place(self, place):
+        with tracing.span("planner.geocode", place=place):
+            res = self._pelias_search(text=place, size=1)
+        if res.get('features'):
+            lon, lat = res['features'][0]['geometry']['coordinates']
+            return (lon, lat)
+        self.logger.error(f"Could not geocode location: {place}")
+        raise ValueError(f"Could not geocode location: {place}")
+
+    def _requery_outliers(self, places, coords, outliers):
+        """
+        Re-query each outlier place inside the (padded) bounding box of the other points
+        and replace its coordinates in place with the candidate closest to them.
+        """
+        # Get bounding box from non-outlier points
+        non_outlier_coords = [coords[i] for i in range(len(coords)) if i not in outliers]
+        bbox = self._get_bounding_box(non_outlier_coords)
+        
+        # Add some padding to the bounding box (20%)
+        if bbox:
+            pad_lon = (bbox['max_lon'] - bbox['min_lon']) * 0.2
+            pad_lat = (bbox['max_lat'] - bbox['min_lat']) * 0.2
+            bbox = {
+                'min_lon': bbox['min_lon'] - pad_lon,
+                'max_lon': bbox['max_lon'] + pad_lon,
+                'min_lat': bbox['min_lat'] - pad_lat,
+                'max_lat': bbox['max_lat'] + pad_lat
+            }
+            
+        for idx in outliers:
+            place = places[idx]
+            tracing.count("geocode_requeries")
+            try:
+                
+                search_params = {
+                    'text': place,
+                    'size': 5
+                }
+                if bbox:
+                    search_params.update({
+                        'rect_min_x': bbox['min_lon'],
+                        'rect_max_x': bbox['max_lon'],
+                        'rect_min_y': bbox['min_lat'],
+                        'rect_max_y': bbox['max_lat']
+                    })
+                res = self._pelias_search(**search_params)
+            except Exception as e:
+                self.logger.warning(f"Re-query failed for '{place}': {e}")
+                continue
+            cand_coords = []
+            for feat in res.get('features', []):
+                try:
+                    lon, lat = feat['geometry']['coordinates']
+                    cand_coords.append((lon, lat))
+                except Exception:
+                    continue
+            fixed = [coords[j] for j in range(len(coords)) if j != idx]
+            best = self._choose_best_candidate(cand_coords, fixed)
+            if best is not None:
+                coords[idx] = best
+
+    @tracing.traced("planner.geocode_itinerary")
     def _geocode_itinerary(self, itinerary, detect_outliers=False):
-        coords = []
         places = [itinerary.start] + itinerary.waypoints + [itinerary.end]
-        for place in places:
-            res = self.ors.pelias_search(text=place, size=1)
-            if res.get('features'):
-                lon, lat = res['features'][0]['geometry']['coordinates']
-                coords.append((lon, lat))
-            else:
-                self.logger.error(f"Could not geocode location: {place}")
-                raise ValueError(f"Could not geocode location: {place}")
+        tracing.set_attribute("places", len(places))
+        coords = [self._geocode_place(place) for place in places]
 
         if detect_outliers:
-            outliers = self._detect_outliers_mad(coords)
+            with tracing.span("planner.outliers") as span:
+                outliers = self._detect_outliers_mad(coords)
+                span.set_attribute("outliers", sorted(outliers))
             if outliers:
                 self.logger.info(f"Outlier indices detected in geocoding: {sorted(list(outliers))}")
-                
-                # Get bounding box from non-outlier points
-                non_outlier_coords = [coords[i] for i in range(len(coords)) if i not in outliers]
-                bbox = self._get_bounding_box(non_outlier_coords)
-                
-                # Add some padding to the bounding box (20%)
-                if bbox:
-                    pad_lon = (bbox['max_lon'] - bbox['min_lon']) * 0.2
-                    pad_lat = (bbox['max_lat'] - bbox['min_lat']) * 0.2
-                    bbox = {
-                        'min_lon': bbox['min_lon'] - pad_lon,
-                        'max_lon': bbox['max_lon'] + pad_lon,
-                        'min_lat': bbox['min_lat'] - pad_lat,
-                        'max_lat': bbox['max_lat'] + pad_lat
-                    }
-                    
-                for idx in outliers:
-                    place = places[idx]
-                    try:
-                        
-                        search_params = {
-                            'text': place,
-                            'size': 5
-                        }
-                        if bbox:
-                            search_params.update({
-                                'rect_min_x': bbox['min_lon'],
-                                'rect_max_x': bbox['max_lon'],
-                                'rect_min_y': bbox['min_lat'],
-                                'rect_max_y': bbox['max_lat']
-                            })
-                        res = self.ors.pelias_search(**search_params)
-                    except Exception as e:
-                        self.logger.warning(f"Re-query failed for '{place}': {e}")
-                        continue
-                    cand_coords = []
-                    for feat in res.get('features', []):
-                        try:
-                            lon, lat = feat['geometry']['coordinates']
-                            cand_coords.append((lon, lat))
-                        except Exception:
-                            continue
-                    fixed = [coords[j] for j in range(len(coords)) if j != idx]
-                    best = self._choose_best_candidate(cand_coords, fixed)
-                    if best is not None:
-                        coords[idx] = best
+                self._requery_outliers(places, coords, outliers)
 
                 # check again if there are outliers
                 outliers = self._detect_outliers_mad(coords)
@@ -185,53 +214,169 @@ class RoutePlanner():
         return coords
 
 
+    def _route_params(self, coords):
+        return {
+            'coordinates': coords,
+            'profile': 'foot-walking',
+            'units':'m',
+            'format': 'geojson',
+            'instructions': False,
+            'preference': 'recommended',
+            'options': { 'avoid_features': ['ferries']},
+            'elevation': True,
+            'extra_info':['steepness', 'suitability', 'surface', 'green', 'noise', 'shadow'] 
+            # Add traildifficulty to include trail running
+            # check ors documentation if you want to add cycling
+            # TODO: ask for instructions for llm to describe after as tourist guide
+            # TODO: try out weightings (given by llm?)
+        }
+
+    @tracing.traced("planner.directions")
     def _request_route(self, coords):
+        tracing.set_attribute("coordinates", len(coords))
         try:
-            route_params = {
-                'coordinates': coords,
-                'profile': 'foot-walking',
-                'units':'m',
-                'format': 'geojson',
-                'instructions': False,
-                'preference': 'recommended',
-                'options': { 'avoid_features': ['ferries']},
-                'elevation': True,
-                'extra_info':['steepness', 'suitability', 'surface', 'green', 'noise', 'shadow'] 
-                # Add traildifficulty to include trail running
-                # check ors documentation if you want to add cycling
-                # TODO: ask for instructions for llm to describe after as tourist guide
-                # TODO: try out weightings (given by llm?)
-            }
-            data = self.ors.directions(**route_params)
+            route_params = self._route_params(coords)
+            data = self._directions(**route_params)
         except Exception as e:
             self.logger.error(f"Error requesting route: {e}")
             raise e
         return data
 
-    def create_route(self, itinerary, save_gpx=True, filename="out/itinerary.gpx"):
+    @tracing.traced("planner.plan_route")
+    def plan_route(self, itinerary):
+        """Geocode and route an itinerary, keeping what is needed to re-plan it incrementally"""
+        from src.route.incremental import RoutePlan
+
         if not itinerary.feasible:
             raise ValueError("Cannot create route for unfeasible itinerary")
         
-        
+        places = [itinerary.start] + itinerary.waypoints + [itinerary.end]
         coords = self._geocode_itinerary(itinerary, detect_outliers=True)
 
         self.logger.info(f"Geocoded coordinates: {coords}")
+        if self.route_index is not None:
+            match = self.route_index.match_waypoints(coords)
+            if match is not None:
+                key, stored = match
+                self.logger.info(f"Reusing stored route {key}")
+                tracing.count("route_index_hits")
+                return RoutePlan(places, coords, stored.json_data)
+
         data = self._request_route(coords)
+        plan = RoutePlan(places, coords, data["features"][0])
+        if self.route_index is not None:
+            self.route_index.add(plan.route)
+        return plan
 
-        route = Route(data["features"][0])
+    def create_route(self, itinerary, save_gpx=True, filename="out/itinerary.gpx"):
+        route = self.plan_route(itinerary).route
         
         if save_gpx:
             route.save_gpx(filename)
         
         return route
 
+    @tracing.traced("planner.replan")
+    def replan(self, plan, edits, max_workers=4):
+        """
+        Apply waypoint edits (see WaypointEdit) to a previous plan. Only the new places
+        are geocoded and only the legs touching them are routed again, the rest of the
+        geometry and extras is reused from the previous plan.
+        """
+        from src.route.incremental import RoutePlan, apply_edits, dirty_runs, split_legs, splice_legs
+
+        places, origin = apply_edits(plan.places, edits)
+        coords = [plan.coords[i] if i is not None else None for i in origin]
+
+        new_indices = [i for i, o in enumerate(origin) if o is None]
+        for i in new_indices:
+            coords[i] = self._geocode_place(places[i])
+
+        # Only re-query the new points, the others were already checked when first planned
+        outliers = self._detect_outliers_mad(coords).intersection(new_indices)
+        if outliers:
+            self.logger.info(f"Outlier indices detected in edited waypoints: {sorted(list(outliers))}")
+            self._requery_outliers(places, coords, outliers)
+
+        runs = dirty_runs(origin)
+        tracing.set_attribute("edits", len(edits))
+        tracing.set_attribute("rerouted_runs", len(runs))
+        self.logger.info(f"Re-routing {len(runs)} run(s) of legs after {len(edits)} edit(s)")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [tracing.submit(pool, self._request_route, coords[first:last + 1]) for first, last in runs]
+            routed = [split_legs(future.result()["features"][0]) for future in futures]
+
+        old_legs = split_legs(plan.feature)
+        legs = [None] * (len(places) - 1)
+        for (first, _), run_legs in zip(runs, routed):
+            legs[first:first + len(run_legs)] = run_legs
+        for k in range(len(legs)):
+            if legs[k] is None:
+                legs[k] = old_legs[origin[k]]
+
+        return RoutePlan(places, coords, splice_legs(legs))
+
+    def _request_round_trip(self, start_coord, distance, points, seed):
+        route_params = self._route_params([start_coord])
+        route_params['options'] = {
+            **route_params['options'],
+            'round_trip': {'length': distance, 'points': points, 'seed': seed},
+        }
+        return self._directions(**route_params)
+
+    @tracing.traced("planner.round_trip")
+    def create_round_trip(self, start, distance, n_candidates=8, max_workers=4,
+                          weights=None, save_gpx=True, filename="out/itinerary.gpx"):
+        """
+        Generate n_candidates loops of roughly `distance` meters starting and ending at `start`,
+        fetching them concurrently (at most max_workers requests in flight), and return the
+        best scoring one.
+        """
+        from src.route.ranking import RouteRanker
 
+        if n_candidates < 1:
+            raise ValueError("At least one candidate is required")
+
+        start_coord = self._geocode_place(start)
+
+        # Vary both the seed and the number of loop points to get different shapes
+        options = [(3 + i % 3, i) for i in range(n_candidates)]
+
+        candidates = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                tracing.submit(pool, self._request_round_trip, start_coord, distance, points, seed): seed
+                for points, seed in options
+            }
+            for future in as_completed(futures):
+                try:
+                    data = future.result()
+                    candidates.append(Route(data["features"][0]))
+                except Exception as e:
+                    self.logger.warning(f"Round trip candidate with seed {futures[future]} failed: {e}")
+
+        if not candidates:
+            raise ValueError(f"Could not generate any round trip from: {start}")
+
+        ranker = RouteRanker(weights=weights, target_distance=distance)
+        route, score = ranker.rank(candidates, k=1)[0]
+        self.logger.info(
+            f"Selected round trip out of {len(candidates)} candidates: "
+            f"{route.distance / 1000:.2f} km, score {score:.3f}"
+        )
+
+        if save_gpx:
+            route.save_gpx(filename)
+
+        return route
 
 
 
         
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
 
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)    
@@ -0,0 +1,172 @@
+import numpy as np
+
+from src.base.route_features import SurfaceType, SteepnessType
+
+
+SURFACE_TYPES = list(SurfaceType)
+STEEPNESS_TYPES = list(SteepnessType)
+
+# Surfaces that are comfortable to run on
+RUNNABLE_SURFACES = {
+    SurfaceType.PAVED,
+    SurfaceType.ASPHALT,
+    SurfaceType.CONCRETE,
+    SurfaceType.PAVING_STONES,
+    SurfaceType.COMPACTED_GRAVEL,
+    SurfaceType.FINE_GRAVEL,
+    SurfaceType.GROUND,
+    SurfaceType.DIRT,
+}
+
+DEFAULT_WEIGHTS = {
+    "distance": 4.0,
+    "greenness": 1.0,
+    "quietness": 1.0,
+    "shadowness": 0.5,
+    "surface": 1.0,
+    "ascent": 0.0,
+}
+
+
+class RouteFeatureTable():
+    """
+    Columnar view over a collection of routes. Scalar columns are 1-d float arrays
+    (NaN when a route lacks the value), surface and steepness are (n_routes, n_types)
+    matrices of percentages taken from the feature summaries.
+    """
+
+    SCALAR_COLUMNS = ("distance", "ascent", "descent", "greenness", "noisiness", "shadowness")
+
+    def __init__(self, routes):
+        self.routes = list(routes)
+        n = len(self.routes)
+
+        self.columns = {name: np.full(n, np.nan) for name in self.SCALAR_COLUMNS}
+        self.surface = np.zeros((n, len(SURFACE_TYPES)))
+        self.steepness = np.zeros((n, len(STEEPNESS_TYPES)))
+        self.has_surface = np.zeros(n, dtype=bool)
+        self.has_steepness = np.zeros(n, dtype=bool)
+
+        surface_idx = {t: i for i, t in enumerate(SURFACE_TYPES)}
+        steepness_idx = {t: i for i, t in enumerate(STEEPNESS_TYPES)}
+
+        for i, route in enumerate(self.routes):
+            self.columns["distance"][i] = route.distance
+            self.columns["ascent"][i] = getattr(route, "total_ascent", np.nan)
+            self.columns["descent"][i] = getattr(route, "total_descent", np.nan)
+            for name, value in (("greenness", route.get_greenness()),
+                                ("noisiness", route.get_noisiness()),
+                                ("shadowness", route.get_shadowness())):
+                if value is not None:
+                    self.columns[name][i] = value
+
+            if route.surface is not None:
+                self.has_surface[i] = True
+                for surface_type, item in route.surface.summary.items():
+                    self.surface[i, surface_idx[surface_type]] = item["percent"]
+
+            if route.steepness is not None:
+                self.has_steepness[i] = True
+                for steepness_type, item in route.steepness.summary.items():
+                    self.steepness[i, steepness_idx[steepness_type]] = item["percent"]
+
+    def __len__(self):
+        return len(self.routes)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def surface_share(self, surfaces):
+        """Percentage of each route on the given surfaces, NaN if the route has no surface data"""
+        mask = np.array([t in surfaces for t in SURFACE_TYPES])
+        share = self.surface[:, mask].sum(axis=1)
+        share[~self.has_surface] = np.nan
+        return share
+
+    def filter(self, **bounds):
+        """
+        Boolean mask of routes whose columns fall in the given (low, high) bounds,
+        e.g. filter(distance=(4000, 6000), ascent=(None, 80)). Routes missing a
+        filtered value are excluded.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for name, (low, high) in bounds.items():
+            values = self.columns[name]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+
+class RouteRanker():
+    """
+    Weighted scoring of routes. Every criterion is normalized to [0, 1] (higher is
+    better) and missing values count as neutral (0.5); the score is the weighted mean.
+    """
+
+    def __init__(self, weights=None, target_distance=None, distance_tolerance=0.25,
+                 preferred_surfaces=RUNNABLE_SURFACES, max_ascent_per_km=50.0):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        unknown = set(self.weights) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown ranking criteria: {sorted(unknown)}")
+
+        self.target_distance = target_distance
+        self.distance_tolerance = distance_tolerance
+        self.preferred_surfaces = preferred_surfaces
+        self.max_ascent_per_km = max_ascent_per_km
+
+    def criteria(self, table):
+        """Normalized (n_routes, n_criteria) matrix, columns ordered as self.weights"""
+        distance = table["distance"]
+        normalized = {}
+
+        if self.target_distance:
+            # A route off by distance_tolerance (relative) or more gets no distance credit
+            error = np.abs(distance - self.target_distance) / self.target_distance
+            normalized["distance"] = 1.0 - np.minimum(error / self.distance_tolerance, 1.0)
+        else:
+            normalized["distance"] = np.full(len(table), np.nan)
+
+        # Gauges are 0-10
+        normalized["greenness"] = table["greenness"] / 10.0
+        normalized["quietness"] = 1.0 - table["noisiness"] / 10.0
+        normalized["shadowness"] = table["shadowness"] / 10.0
+        normalized["surface"] = table.surface_share(self.preferred_surfaces) / 100.0
+
+        # Hillier is better for positive weights, flatter for negative ones
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ascent_per_km = table["ascent"] / (distance / 1000.0)
+        normalized["ascent"] = np.minimum(ascent_per_km / self.max_ascent_per_km, 1.0)
+
+        matrix = np.column_stack([normalized[name] for name in self.weights])
+        return np.nan_to_num(matrix, nan=0.5, posinf=0.5, neginf=0.5)
+
+    def score(self, table):
+        if len(table) == 0:
+            return np.empty(0)
+        w = np.array(list(self.weights.values()), dtype=float)
+        total = np.abs(w).sum()
+        if total == 0:
+            return np.zeros(len(table))
+        return self.criteria(table) @ w / total
+
+    def top_k(self, table, k=None, **bounds):
+        """
+        Indices and scores of the k best routes passing the filter bounds,
+        best first. k=None returns every route that passed.
+        """
+        scores = self.score(table)
+        candidates = np.flatnonzero(table.filter(**bounds)) if bounds else np.arange(len(table))
+        if k is not None and k < len(candidates):
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return order, scores[order]
+
+    def rank(self, routes, k=None, **bounds):
+        """List of (route, score) tuples for the k best routes, best first"""
+        table = routes if isinstance(routes, RouteFeatureTable) else RouteFeatureTable(routes)
+        order, scores = self.top_k(table, k, **bounds)
+        return [(table.routes[i], float(s)) for i, s in zip(order, scores)]
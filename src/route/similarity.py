@@ -0,0 +1,325 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.base.geo import EARTH_RADIUS_M, to_meters
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lon, lat, precision=7):
+    """Standard base32 geohash of a point"""
+    lon_range = [-180.0, 180.0]
+    lat_range = [-90.0, 90.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        rng, x = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if x >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision=7):
+    """(width, height) of a geohash cell in degrees"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 360.0 / 2 ** lon_bits, 180.0 / 2 ** lat_bits
+
+
+def geohash_neighborhood(lon, lat, precision=7):
+    """Cell of the point and its 8 neighbours, so lookups don't miss points close to a cell border"""
+    width, height = geohash_cell_size(precision)
+    return {
+        geohash(lon + dx * width, lat + dy * height, precision)
+        for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+    }
+
+
+def resample(coords, n):
+    """n (lon, lat) points evenly spaced along the track"""
+    coords = np.asarray(coords, dtype=float)[:, :2]
+    xy = to_meters(coords, coords[:, 1].mean())
+    along = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))))
+    if along[-1] == 0:
+        return np.repeat(coords[:1], n, axis=0)
+    targets = np.linspace(0, along[-1], n)
+    return np.column_stack((np.interp(targets, along, coords[:, 0]), np.interp(targets, along, coords[:, 1])))
+
+
+def frechet_distance(a, b):
+    """
+    Discrete Fréchet distance in meters between two (lon, lat) polylines. O(n*m):
+    meant for the resampled fingerprints, not for raw geometries.
+    """
+    lat0 = (np.mean(a[:, 1]) + np.mean(b[:, 1])) / 2
+    a, b = to_meters(a, lat0), to_meters(b, lat0)
+    d = np.hypot(a[:, None, 0] - b[None, :, 0], a[:, None, 1] - b[None, :, 1]).tolist()
+
+    n, m = len(a), len(b)
+    previous = list(itertools.accumulate(d[0], max))
+    for i in range(1, n):
+        row = d[i]
+        current = [max(row[0], previous[0])]
+        for j in range(1, m):
+            current.append(max(row[j], min(previous[j], previous[j - 1], current[j - 1])))
+        previous = current
+    return previous[-1]
+
+
+class RouteFingerprint():
+    """
+    Compact description of a route's geometry: `points` are n_samples (lon, lat)
+    points evenly spaced along the track, `cells` the set of geohash cells the track
+    goes through (sampled densely enough not to skip any).
+    """
+
+    def __init__(self, route, n_samples=32, precision=7):
+        coords = route.route_coords
+        self.distance = route.distance
+        self.points = resample(coords, n_samples)
+
+        width, height = geohash_cell_size(precision)
+        cell_m = min(width * np.cos(np.radians(coords[0][1])), height) * np.pi / 180 * EARTH_RADIUS_M
+        n_cells = max(n_samples, int(self.distance / (cell_m / 2)) + 1)
+        self.cells = {geohash(lon, lat, precision) for lon, lat in resample(coords, n_cells)}
+
+    def to_dict(self):
+        return {"distance": self.distance, "points": self.points.tolist(), "cells": sorted(self.cells)}
+
+    @classmethod
+    def from_dict(cls, data):
+        fingerprint = cls.__new__(cls)
+        fingerprint.distance = data["distance"]
+        fingerprint.points = np.asarray(data["points"], dtype=float)
+        fingerprint.cells = set(data["cells"])
+        return fingerprint
+
+    def overlap(self, other):
+        """Jaccard index of the geohash cell sets"""
+        if not self.cells or not other.cells:
+            return 0.0
+        return len(self.cells & other.cells) / len(self.cells | other.cells)
+
+    def aligned_distance(self, other):
+        """
+        Largest distance between points at the same along-track fraction: an upper
+        bound of the Fréchet distance, cheap enough to accept obvious duplicates.
+        """
+        lat0 = (self.points[0, 1] + other.points[0, 1]) / 2
+        delta = to_meters(self.points, lat0) - to_meters(other.points, lat0)
+        return float(np.hypot(delta[:, 0], delta[:, 1]).max())
+
+    def endpoint_distance(self, other):
+        """Lower bound of the Fréchet distance: both curves start and end together"""
+        lat0 = (self.points[0, 1] + other.points[0, 1]) / 2
+        ends = to_meters(self.points[[0, -1]], lat0) - to_meters(other.points[[0, -1]], lat0)
+        return float(np.hypot(ends[:, 0], ends[:, 1]).max())
+
+    def distance_to(self, other, bound=None):
+        """
+        Fréchet distance between the fingerprints in meters. With `bound`, the exact
+        computation is skipped (returning a bound) when the cheap bounds already decide
+        whether the distance is within it.
+        """
+        if bound is not None:
+            lower = self.endpoint_distance(other)
+            if lower > bound:
+                return lower
+            upper = self.aligned_distance(other)
+            if upper <= bound:
+                return upper
+        return frechet_distance(self.points, other.points)
+
+
+class RouteIndex():
+    """
+    In-memory similarity index over routes. Fingerprint cells go into an inverted
+    index, so a query only compares geometry with routes sharing at least
+    `min_overlap` of their cells; survivors are ranked by (approximate) Fréchet
+    distance.
+
+    Besides similarity queries, routes can be looked up by the coordinates they were
+    routed through (match_waypoints) to reuse a stored route instead of requesting
+    directions again.
+
+    With max_routes, the least recently used routes (added, looked up or matched)
+    are evicted once the index is full, so a long-running process stays bounded.
+
+    Only fingerprints are used for indexing: when one is given to add(), the stored
+    route can be any payload (match_waypoints needs a Route).
+    """
+
+    def __init__(self, n_samples=32, precision=7, min_overlap=0.3, max_routes=None):
+        if max_routes is not None and max_routes < 1:
+            raise ValueError("max_routes must be at least 1")
+        self.n_samples = n_samples
+        self.precision = precision
+        self.min_overlap = min_overlap
+        self.max_routes = max_routes
+        self.evicted = 0
+
+        self.routes = OrderedDict()
+        self.fingerprints = {}
+        self._cells = {}
+        self._starts = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.routes)
+
+    def __contains__(self, key):
+        return key in self.routes
+
+    def get(self, key):
+        with self._lock:
+            route = self.routes.get(key)
+            if route is not None:
+                self.routes.move_to_end(key)
+            return route
+
+    def fingerprint(self, route):
+        return RouteFingerprint(route, self.n_samples, self.precision)
+
+    def add(self, route, key=None, fingerprint=None):
+        fingerprint = fingerprint or self.fingerprint(route)
+        with self._lock:
+            key = next(self._ids) if key is None else key
+            if key in self.routes:
+                self._remove(key)
+            self.routes[key] = route
+            self.fingerprints[key] = fingerprint
+            for cell in fingerprint.cells:
+                self._cells.setdefault(cell, set()).add(key)
+            start = geohash(*fingerprint.points[0], self.precision)
+            self._starts.setdefault(start, set()).add(key)
+
+            while self.max_routes is not None and len(self.routes) > self.max_routes:
+                self._remove(next(iter(self.routes)))
+                self.evicted += 1
+        return key
+
+    def _remove(self, key):
+        del self.routes[key]
+        fingerprint = self.fingerprints.pop(key)
+        for cell in fingerprint.cells:
+            self._cells[cell].discard(key)
+            if not self._cells[cell]:
+                del self._cells[cell]
+        start = geohash(*fingerprint.points[0], self.precision)
+        self._starts[start].discard(key)
+        if not self._starts[start]:
+            del self._starts[start]
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _candidates(self, fingerprint, min_overlap):
+        """
+        (key, route, fingerprint) of the routes sharing at least min_overlap of their
+        cells with the fingerprint, taken under the lock so eviction can't race them
+        """
+        with self._lock:
+            shared = {}
+            for cell in fingerprint.cells:
+                for key in self._cells.get(cell, ()):
+                    shared[key] = shared.get(key, 0) + 1
+
+            candidates = []
+            for key, count in shared.items():
+                other = self.fingerprints[key]
+                if count / (len(fingerprint.cells) + len(other.cells) - count) >= min_overlap:
+                    candidates.append((key, self.routes[key], other))
+        return candidates
+
+    def similar(self, route, k=5, max_distance=None, min_overlap=None):
+        """
+        Up to k stored routes most similar to `route`, as (key, route, distance in
+        meters) sorted by distance.
+        """
+        fingerprint = route if isinstance(route, RouteFingerprint) else self.fingerprint(route)
+        min_overlap = self.min_overlap if min_overlap is None else min_overlap
+
+        results = []
+        for key, stored, other in self._candidates(fingerprint, min_overlap):
+            distance = fingerprint.distance_to(other)
+            if max_distance is None or distance <= max_distance:
+                results.append((key, stored, distance))
+        results.sort(key=lambda r: r[2])
+        return results[:k]
+
+    def find_duplicate(self, route, threshold=50.0, min_overlap=0.5):
+        """Key of a stored route whose geometry is within `threshold` meters (Fréchet) of `route`, or None"""
+        fingerprint = route if isinstance(route, RouteFingerprint) else self.fingerprint(route)
+
+        best, best_distance = None, None
+        for key, _, other in self._candidates(fingerprint, min_overlap):
+            distance = fingerprint.distance_to(other, bound=threshold)
+            if distance <= threshold and (best_distance is None or distance < best_distance):
+                best, best_distance = key, distance
+        return best
+
+    def add_unique(self, route, key=None, threshold=50.0, fingerprint=None):
+        """Add `route` unless a near duplicate is stored. Returns (key, added)"""
+        fingerprint = fingerprint or self.fingerprint(route)
+        duplicate = self.find_duplicate(fingerprint, threshold)
+        if duplicate is not None:
+            return duplicate, False
+        return self.add(route, key, fingerprint), True
+
+    def match_waypoints(self, coords, tolerance=100.0):
+        """
+        (key, route) of a stored route that was routed through `coords` (lon, lat), in
+        order: each of its way_points vertices lies within `tolerance` meters of the
+        matching coordinate. None if there is no such route.
+        """
+        start = geohash_neighborhood(*coords[0], self.precision)
+        with self._lock:
+            candidates = set().union(*(self._starts.get(cell, ()) for cell in start))
+            candidates = [(key, self.routes[key]) for key in candidates]
+
+        coords = np.asarray(coords, dtype=float)
+        for key, route in candidates:
+            way_points = route.json_data["properties"].get("way_points", [])
+            if len(way_points) != len(coords):
+                continue
+            vertices = np.asarray([route.route_coords[i][:2] for i in way_points], dtype=float)
+            lat0 = coords[:, 1].mean()
+            delta = to_meters(vertices, lat0) - to_meters(coords, lat0)
+            if np.hypot(delta[:, 0], delta[:, 1]).max() <= tolerance:
+                with self._lock:
+                    if key in self.routes:
+                        self.routes.move_to_end(key)
+                return key, route
+        return None
+
+
+def deduplicate(routes, threshold=50.0):
+    """
+    Collapse near-duplicate routes. Returns the unique routes (first occurrence kept)
+    and, for every input route, the position of its representative among them.
+    """
+    index = RouteIndex()
+    unique, representative, positions = [], [], {}
+    for route in routes:
+        key, added = index.add_unique(route, threshold=threshold)
+        if added:
+            positions[key] = len(unique)
+            unique.append(route)
+        representative.append(positions[key])
+    return unique, representative
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+
+def canonical_key(name, params):
+    """
+    Stable key for an API call: strings are whitespace-collapsed and case-folded,
+    floats rounded to 6 decimals (~0.1 m) and dict keys sorted, so requests that
+    only differ in formatting share the same key.
+    """
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.split()).casefold()
+        if isinstance(value, float):
+            return round(value, 6)
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        return value
+
+    return name + ":" + json.dumps(normalize(params), sort_keys=True, default=str)
+
+
+class _Call():
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """
+    Coalesce identical in-flight calls: while a call for a key is running, other
+    callers asking for the same key wait for it and get the same result (or the
+    same exception) instead of issuing their own request. Nothing is cached once
+    the call has finished. Results are shared, callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """
+        Same as do() for coroutine functions, coalescing tasks of the running event loop.
+        The call runs in its own task that every caller awaits through a shield, so
+        cancelling any caller, the first one included, does not cancel the others.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is not None:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            task = loop.create_task(fn(*args, **kwargs))
+            calls[key] = task
+            with self._lock:
+                self.executed += 1
+            task.add_done_callback(lambda t: self._finish_async(loop, key, t))
+        return await asyncio.shield(task)
+
+    def _finish_async(self, loop, key, task):
+        calls = self._async_calls.get(loop, {})
+        if calls.get(key) is task:
+            del calls[key]
+            if not calls:
+                self._async_calls.pop(loop, None)
+        if not task.cancelled():
+            # Mark retrieved so asyncio does not warn when every caller was cancelled
+            task.exception()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + sum(len(c) for c in self._async_calls.values()),
+            }
@@ -0,0 +1,289 @@
+import numpy as np
+
+from src.base.geo import segment_lengths
+from src.base.route_features import SurfaceType
+from src.telemetry import tracing
+
+
+DEFAULT_PACE = 360.0  # s/km on flat ground
+
+# Representative grade (%) of each ORS steepness class, used when there is no elevation
+STEEPNESS_GRADES = np.array([0.0, 2.0, 5.0, 9.0, 13.5, 18.0])
+
+# Minetti's energy cost of running assumes runners fully exploit downhills, which they
+# don't over a whole split, so the downhill speed-up is capped
+MIN_GRADE_FACTOR = 0.85
+MAX_GRADE = 0.45
+
+# Grades are taken over windows of about this many meters: per-edge grades of a noisy
+# elevation profile always average out slower because the cost curve is convex
+GRADE_WINDOW = 100.0
+
+
+def grade_factor(grade):
+    """
+    Effort relative to flat ground at a given grade (fraction, e.g. 0.05 for 5%),
+    from Minetti et al. (2002) energy cost of running, 3.6 J/kg/m on the flat.
+    """
+    i = np.clip(grade, -MAX_GRADE, MAX_GRADE)
+    cost = 155.4 * i ** 5 - 30.4 * i ** 4 - 43.3 * i ** 3 + 46.3 * i ** 2 + 19.5 * i + 3.6
+    return np.maximum(cost / 3.6, MIN_GRADE_FACTOR)
+
+
+def parse_pace(pace):
+    """Pace as seconds per km from a number or a "m:ss" string"""
+    if isinstance(pace, str):
+        minutes, _, seconds = pace.partition(":")
+        return int(minutes) * 60 + float(seconds or 0)
+    return float(pace)
+
+
+def format_pace(seconds):
+    seconds = int(round(seconds))
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def _edge_values(intervals, n_edges, fill):
+    """Per-edge array from ORS extras intervals [start vertex, end vertex, value]"""
+    values = np.full(n_edges, fill, dtype=float)
+    if not intervals:
+        return values
+    starts, ends, vals = (np.asarray(col) for col in zip(*intervals))
+    ends = np.minimum(ends, n_edges)
+    lengths = np.maximum(ends - starts, 0)
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    values[np.arange(lengths.sum()) + offsets] = np.repeat(vals.astype(float), lengths)
+    return values
+
+
+class Split():
+
+    def __init__(self, index, start, distance, ascent, descent, steepness, surface,
+                 factor, pace, elapsed, position, elevation):
+        self.index = index
+        self.start = start
+        self.distance = distance
+        self.ascent = ascent
+        self.descent = descent
+        self.steepness = steepness
+        self.surface = surface
+        self.factor = factor
+        self.pace = pace
+        self.time = pace * distance / 1000
+        self.elapsed = elapsed
+        self.position = position  # (lon, lat) of the end of the split
+        self.elevation = elevation
+
+    @property
+    def end(self):
+        return self.start + self.distance
+
+    @property
+    def grade(self):
+        """Net grade in percent"""
+        return 100 * (self.ascent - self.descent) / self.distance if self.distance else 0.0
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "start": round(self.start, 1),
+            "distance": round(self.distance, 1),
+            "ascent": round(self.ascent, 1),
+            "descent": round(self.descent, 1),
+            "grade": round(self.grade, 2),
+            "steepness": None if self.steepness is None else round(self.steepness, 2),
+            "surface": None if self.surface is None else str(self.surface),
+            "grade_factor": round(self.factor, 3),
+            "pace": round(self.pace, 1),
+            "time": round(self.time, 1),
+            "elapsed": round(self.elapsed, 1),
+            "position": list(self.position),
+            "elevation": self.elevation,
+        }
+
+    def __repr__(self):
+        return (f"Split({self.index + 1}: {self.distance / 1000:.2f} km, +{self.ascent:.0f}/-{self.descent:.0f} m, "
+                f"{self.surface}, {format_pace(self.pace)}/km)")
+
+
+class PacePlan():
+    """
+    Per-kilometer (or split_length meters) splits of a route with elevation gain and
+    loss, dominant surface, average ORS steepness class and grade-adjusted target
+    paces.
+
+    Everything is computed in one vectorized pass: the split boundaries are inserted
+    into the cumulative distance of the geometry, and every resulting piece of edge
+    is binned into its split with its elevation change, surface and steepness.
+
+    The flat pace comes from target_pace (s/km or "m:ss") or, if given, is solved
+    from target_time (seconds for the whole route). Each split's pace is the flat
+    pace times its grade factor, averaged over grades taken on ~GRADE_WINDOW meter
+    windows so elevation noise doesn't slow every split down.
+    """
+
+    def __init__(self, route, split_length=1000.0, target_pace=None, target_time=None):
+        if split_length <= 0:
+            raise ValueError("split_length must be positive")
+        self.route = route
+        self.split_length = split_length
+        with tracing.span("route.splits", split_length=split_length):
+            self._compute(target_pace, target_time)
+
+    def _compute(self, target_pace, target_time):
+        route = self.route
+        coords = np.asarray(route.route_coords, dtype=float)
+        n_edges = len(coords) - 1
+        if n_edges < 1:
+            raise ValueError("Route needs at least two points")
+
+        along = np.concatenate(([0.0], np.cumsum(segment_lengths(coords))))
+        if along[-1] > 0 and route.distance:
+            # Match the distance ORS reports, the geometry is slightly simplified
+            along *= route.distance / along[-1]
+        total = along[-1]
+
+        n_splits = max(1, int(np.ceil(total / self.split_length - 1e-9)))
+        boundaries = self.split_length * np.arange(1, n_splits)
+        starts = np.concatenate(([0.0], boundaries))
+        ends = np.append(boundaries, total)
+
+        # Pieces of edges between consecutive vertices / split boundaries
+        cuts = np.union1d(along, boundaries)
+        lengths = np.diff(cuts)
+        middles = cuts[:-1] + lengths / 2
+        split_of = np.searchsorted(boundaries, middles, side="right")
+        edge_of = np.clip(np.searchsorted(along, middles, side="right") - 1, 0, n_edges - 1)
+
+        def per_split(weights):
+            return np.bincount(split_of, weights=weights, minlength=n_splits)
+
+        distances = per_split(lengths)
+
+        has_elevation = coords.shape[1] > 2
+        if has_elevation:
+            elevations = np.interp(cuts, along, coords[:, 2])
+            dz = np.diff(elevations)
+            ascents = per_split(np.maximum(dz, 0))
+            descents = per_split(np.maximum(-dz, 0))
+
+            # Net grade of evenly spaced windows within each split, looked up per piece
+            windows = np.unique(np.concatenate([
+                np.linspace(start, end, max(1, int(round((end - start) / GRADE_WINDOW))) + 1)
+                for start, end in zip(starts, ends)
+            ]))
+            window_lengths = np.diff(windows)
+            window_grades = np.divide(np.diff(np.interp(windows, along, coords[:, 2])), window_lengths,
+                                      out=np.zeros_like(window_lengths), where=window_lengths > 0)
+            window_of = np.clip(np.searchsorted(windows, middles, side="right") - 1, 0, len(window_grades) - 1)
+            grades = window_grades[window_of]
+        else:
+            ascents = descents = np.zeros(n_splits)
+
+        steepness = None
+        if route.steepness is not None and route.steepness.data:
+            levels = _edge_values([(s, e, t.value) for s, e, t in route.steepness.data], n_edges, np.nan)[edge_of]
+            known = ~np.isnan(levels)
+            weight = per_split(np.where(known, lengths, 0))
+            steepness = np.divide(per_split(np.where(known, levels * lengths, 0)), weight,
+                                  out=np.full(n_splits, np.nan), where=weight > 0)
+            if not has_elevation:
+                filled = np.nan_to_num(levels)
+                grades = np.sign(filled) * STEEPNESS_GRADES[np.abs(filled).astype(int)] / 100
+
+        surfaces = [None] * n_splits
+        if route.surface is not None and route.surface.data:
+            codes = _edge_values([(s, e, t.value) for s, e, t in route.surface.data], n_edges, -1)[edge_of]
+            known = codes >= 0
+            n_types = len(SurfaceType)
+            table = np.bincount(
+                split_of[known] * n_types + codes[known].astype(int),
+                weights=lengths[known],
+                minlength=n_splits * n_types,
+            ).reshape(n_splits, n_types)
+            surfaces = [SurfaceType(int(row.argmax())) if row.any() else None for row in table]
+
+        if has_elevation or steepness is not None:
+            factors = np.divide(per_split(grade_factor(grades) * lengths), distances,
+                                out=np.ones(n_splits), where=distances > 0)
+        else:
+            factors = np.ones(n_splits)
+
+        if target_time is not None:
+            effort_km = (factors * distances).sum() / 1000
+            self.flat_pace = target_time / effort_km if effort_km else DEFAULT_PACE
+        else:
+            self.flat_pace = parse_pace(target_pace if target_pace is not None else DEFAULT_PACE)
+        paces = self.flat_pace * factors
+        elapsed = np.cumsum(paces * distances / 1000)
+
+        lons = np.interp(ends, along, coords[:, 0])
+        lats = np.interp(ends, along, coords[:, 1])
+        end_elevations = np.interp(ends, along, coords[:, 2]) if has_elevation else [None] * n_splits
+
+        self.splits = [
+            Split(
+                index=i,
+                start=float(starts[i]),
+                distance=float(distances[i]),
+                ascent=float(ascents[i]),
+                descent=float(descents[i]),
+                steepness=None if steepness is None or np.isnan(steepness[i]) else float(steepness[i]),
+                surface=surfaces[i],
+                factor=float(factors[i]),
+                pace=float(paces[i]),
+                elapsed=float(elapsed[i]),
+                position=(round(float(lons[i]), 6), round(float(lats[i]), 6)),
+                elevation=None if end_elevations[i] is None else round(float(end_elevations[i]), 1),
+            )
+            for i in range(n_splits)
+        ]
+        self.total_time = float(elapsed[-1])
+
+    def __len__(self):
+        return len(self.splits)
+
+    def __iter__(self):
+        return iter(self.splits)
+
+    def __getitem__(self, i):
+        return self.splits[i]
+
+    def to_dict(self):
+        return {
+            "split_length": self.split_length,
+            "flat_pace": round(self.flat_pace, 1),
+            "total_time": round(self.total_time, 1),
+            "splits": [split.to_dict() for split in self.splits],
+        }
+
+    def waypoints(self):
+        """(lon, lat, elevation, name, description) at the end of every split, for GPX export"""
+        points = []
+        for split in self.splits:
+            km = split.end / 1000
+            name = f"KM {round(km)}" if abs(km - round(km)) < 1e-6 else f"{km:.2f} km"
+            description = (
+                f"Split {split.index + 1}: {format_pace(split.pace)}/km, "
+                f"+{split.ascent:.0f}/-{split.descent:.0f} m"
+                + (f", {split.surface}" if split.surface is not None else "")
+                + f", elapsed {format_duration(split.elapsed)}"
+            )
+            points.append((*split.position, split.elevation, name, description))
+        return points
+
+    def __str__(self):
+        lines = [f"{'split':>5} {'km':>6} {'+m':>5} {'-m':>5} {'grade':>6} {'pace':>6}  surface"]
+        for split in self.splits:
+            lines.append(
+                f"{split.index + 1:>5} {split.end / 1000:>6.2f} {split.ascent:>5.0f} {split.descent:>5.0f} "
+                f"{split.grade:>5.1f}% {format_pace(split.pace):>6}  {split.surface or '-'}"
+            )
+        lines.append(f"Total {format_duration(self.total_time)} at {format_pace(self.flat_pace)}/km flat pace")
+        return "\n".join(lines)
@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from time import time
+
+from dotenv import load_dotenv
+
+from src.agent.builder import ItineraryBuilder
+from src.route.planner import RoutePlanner
+from src.route.similarity import RouteIndex
+from src.telemetry import tracing
+from src.telemetry.exporters import render_prometheus
+from src.visualize.visualizer import RouteVisualizer
+
+
+MAX_BODY_SIZE = 64 * 1024
+REQUEST_TIMEOUT = 10.0  # seconds to receive the headers and body of a request
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class RouteService():
+    """
+    Long-running route service. The chat model, ORS client and prompt templates are
+    built once and shared by every request, so a warm request only pays for the
+    model and routing calls.
+
+    At most max_concurrency requests run at the same time (in a thread pool, since
+    the model and ORS clients are blocking); up to max_queue more wait for a slot
+    and anything beyond that is rejected with 503 instead of piling up.
+
+    A client that doesn't send its whole request within request_timeout seconds gets
+    a 408, so stalled connections don't hold a socket forever.
+    """
+
+    def __init__(self, builder, planner, max_concurrency=4, max_queue=32, request_timeout=REQUEST_TIMEOUT):
+        self.builder = builder
+        self.planner = planner
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.request_timeout = request_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="route")
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self.stats = {"served": 0, "rejected": 0, "failed": 0}
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.INFO)
+
+    @tracing.traced("service.request")
+    def _plan(self, query, compact, with_map):
+        """Blocking part of a request, runs in the thread pool"""
+        itinerary = self.builder.request_running_itinerary(query)
+        if itinerary.feasible is False:
+            return {"feasible": False, "updated_request": itinerary.updated_request}
+
+        route = self.planner.create_route(itinerary, save_gpx=False)
+        result = {
+            "feasible": True,
+            "itinerary": itinerary.to_dict(),
+            "distance": route.distance,
+            "gpx": route.to_gpx(),
+        }
+        if with_map:
+            visualizer = RouteVisualizer(route, compact=compact)
+            visualizer.create_map()
+            result["map_html"] = visualizer.to_html()
+        return result
+
+    async def plan(self, query, compact=True, with_map=True):
+        if self._waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            tracing.count("service_rejected")
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many queued requests", {"Retry-After": "5"})
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        start = time()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, self._plan, query, compact, with_map)
+            self.stats["served"] += 1
+            return result
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._running -= 1
+            self._slots.release()
+            self.logger.info(f"Request handled in {round(time() - start, 2)}s")
+
+    def health(self):
+        index = self.planner.route_index
+        return {
+            **self.stats,
+            "running": self._running,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "ors_calls": self.planner.flights.stats(),
+            "stored_routes": len(index) if index is not None else 0,
+            "evicted_routes": index.evicted if index is not None else 0,
+        }
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body shorter than Content-Length")
+        return method.upper(), path.split("?", 1)[0], body
+
+    async def _dispatch(self, method, path, body):
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, self.health()
+
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, render_prometheus(tracing.get_telemetry().snapshot())
+
+        if path == "/route":
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST")
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                # JSONDecodeError, or a body that is not valid UTF-8
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON")
+            if not isinstance(payload, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+            query = payload.get("query")
+            if not isinstance(query, str) or not query.strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing 'query'")
+
+            compact = payload.get("compact", True)
+            with_map = payload.get("map", True)
+            if not isinstance(compact, bool) or not isinstance(with_map, bool):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'compact' and 'map' must be booleans")
+
+            result = await self.plan(query, compact=compact, with_map=with_map)
+            status = HTTPStatus.OK if result["feasible"] else HTTPStatus.UNPROCESSABLE_ENTITY
+            return status, result
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+    async def handle_connection(self, reader, writer):
+        headers = {}
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), self.request_timeout)
+            except asyncio.TimeoutError:
+                raise HTTPError(HTTPStatus.REQUEST_TIMEOUT, "Timed out reading the request")
+            if request is None:
+                return
+            status, payload = await self._dispatch(*request)
+        except HTTPError as e:
+            status, payload, headers = e.status, {"error": e.message}, e.headers
+        except Exception as e:
+            self.logger.exception("Request failed")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ] + [f"{k}: {v}" for k, v in headers.items()]
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        self.logger.info(f"Route service listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RunScape route service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="gemini-2.5-flash", help='any model of src.agent.backends, "stub" for an offline model')
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds per call of the stub model")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--request-timeout", type=float, default=REQUEST_TIMEOUT, help="seconds to receive a request")
+    parser.add_argument("--max-stored-routes", type=int, default=1000, help="routes kept for reuse (LRU)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+
+    backend_options = {"latency": args.stub_latency} if args.model.startswith("stub") else None
+    builder = ItineraryBuilder(api_key=None, model=args.model, temperature=0, debug=False, backend_options=backend_options)
+    # Shared by all requests: itineraries geocoding to the same points reuse the stored route
+    planner = RoutePlanner(
+        ors_api_key=os.getenv("ORS_API_KEY"),
+        route_index=RouteIndex(max_routes=args.max_stored_routes),
+    )
+
+    async def run():
+        service = RouteService(builder, planner, args.max_concurrency, args.max_queue, args.request_timeout)
+        await service.serve(args.host, args.port)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
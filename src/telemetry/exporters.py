@@ -0,0 +1,92 @@
+import json
+import sys
+import threading
+
+
+class Exporter():
+    """Base exporter: receives every finished span and metric snapshots on flush"""
+
+    def export_span(self, span):
+        pass
+
+    def export_metrics(self, snapshot):
+        pass
+
+
+class JsonLinesExporter(Exporter):
+    """One JSON object per line for each span and for each metrics flush"""
+
+    def __init__(self, path=None, stream=None):
+        self._lock = threading.Lock()
+        self._owned = stream is None and path is not None
+        self.stream = open(path, "a") if self._owned else (stream or sys.stderr)
+
+    def _write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def export_span(self, span):
+        self._write({"type": "span", **span.to_dict()})
+
+    def export_metrics(self, snapshot):
+        self._write({"type": "metrics", **snapshot})
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=None):
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(items.items())) + "}"
+
+
+def render_prometheus(snapshot, prefix="runscape_"):
+    """Render a Telemetry snapshot in the Prometheus text exposition format"""
+    lines = []
+
+    counters = {}
+    for counter in snapshot["counters"]:
+        counters.setdefault(counter["name"], []).append(counter)
+    for name, series in sorted(counters.items()):
+        metric = f"{prefix}{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for counter in series:
+            lines.append(f"{metric}{_format_labels(counter['labels'])} {counter['value']}")
+
+    histograms = {}
+    for histogram in snapshot["histograms"]:
+        histograms.setdefault(histogram["name"], []).append(histogram)
+    for name, series in sorted(histograms.items()):
+        metric = f"{prefix}{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for histogram in series:
+            cumulative = 0
+            for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_format_labels(histogram['labels'], {'le': bound})} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(histogram['labels'], {'le': '+Inf'})} {histogram['count']}")
+            lines.append(f"{metric}_sum{_format_labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{metric}_count{_format_labels(histogram['labels'])} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter(Exporter):
+    """Writes the metrics in Prometheus text format to `path` on every flush"""
+
+    def __init__(self, path, prefix="runscape_"):
+        self.path = path
+        self.prefix = prefix
+
+    def export_metrics(self, snapshot):
+        with open(self.path, "w") as f:
+            f.write(render_prometheus(snapshot, self.prefix))
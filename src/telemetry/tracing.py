@@ -0,0 +1,198 @@
+import contextvars
+import itertools
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter, time
+
+
+# Latency buckets in seconds, from cheap local stages up to slow model calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span():
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time()
+        self._start = perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"Span(name={self.name}, duration={self.duration}, attributes={self.attributes})"
+
+
+class Histogram():
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Telemetry():
+    """
+    Spans, counters and latency histograms for the whole pipeline.
+
+    Spans nest through a context variable, so a span opened inside another one (in the
+    same thread, or in a task/thread that copied the context) becomes its child. Every
+    finished span is passed to the exporters and its duration is recorded in the
+    `span_duration_seconds` histogram.
+    """
+
+    def __init__(self, exporters=None):
+        self.exporters = list(exporters or [])
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, parent=_current_span.get(), attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = perf_counter() - span._start
+            _current_span.reset(token)
+            self.observe("span_duration_seconds", span.duration, span=name)
+            for exporter in self.exporters:
+                exporter.export_span(span)
+
+    def count(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self):
+        """Copy of all counters and histograms, safe to hand to an exporter"""
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "buckets": list(h.buckets),
+                        "counts": list(h.counts),
+                        "sum": h.sum,
+                        "count": h.count,
+                    }
+                    for (name, labels), h in self.histograms.items()
+                ],
+            }
+
+    def flush(self):
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter.export_metrics(snapshot)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def current_span():
+    return _current_span.get()
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry():
+    return _telemetry
+
+
+def set_telemetry(telemetry):
+    global _telemetry
+    _telemetry = telemetry
+
+
+def span(name, **attributes):
+    return _telemetry.span(name, **attributes)
+
+
+def count(name, value=1, **labels):
+    _telemetry.count(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _telemetry.observe(name, value, **labels)
+
+
+def set_attribute(key, value):
+    """Set an attribute on the current span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+def traced(name):
+    """Decorator running the function inside a span called `name`"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def submit(pool, fn, *args, **kwargs):
+    """
+    pool.submit that runs fn in a copy of the caller's context, so spans opened in
+    the worker thread are children of the caller's current span.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,145 @@
+import json
+from typing import List, Sequence
+
+from branca.element import Element, MacroElement
+from folium.template import Template
+from folium.vector_layers import path_options
+from folium import Popup, Tooltip
+
+
+# Minimal decoder for the encoded polyline algorithm, added once per page
+DECODER_SCRIPT = """<script>
+function decodePolyline(str, precision) {
+    var index = 0, lat = 0, lng = 0, coordinates = [], factor = Math.pow(10, precision);
+    while (index < str.length) {
+        var shift = 0, result = 0, byte;
+        do { byte = str.charCodeAt(index++) - 63; result |= (byte & 0x1f) << shift; shift += 5; } while (byte >= 0x20);
+        lat += (result & 1) ? ~(result >> 1) : (result >> 1);
+        shift = 0; result = 0;
+        do { byte = str.charCodeAt(index++) - 63; result |= (byte & 0x1f) << shift; shift += 5; } while (byte >= 0x20);
+        lng += (result & 1) ? ~(result >> 1) : (result >> 1);
+        coordinates.push([lat / factor, lng / factor]);
+    }
+    return coordinates;
+}
+</script>"""
+
+
+def _encode_value(value: int, out: List[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(points: Sequence[Sequence[float]], precision: int = 5) -> str:
+    """
+    Encode [lat, lon] points with Google's encoded polyline algorithm: coordinates
+    are quantized to `precision` decimals (5 is ~1 m) and delta-encoded as ASCII.
+    """
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for lat, lon, *_ in points:
+        lat_q, lon_q = round(lat * factor), round(lon * factor)
+        _encode_value(lat_q - prev_lat, out)
+        _encode_value(lon_q - prev_lon, out)
+        prev_lat, prev_lon = lat_q, lon_q
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverse of encode_polyline"""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append([lat / factor, lon / factor])
+    return points
+
+
+class EncodedPolyLine(MacroElement):
+    """
+    Drop-in replacement for folium.PolyLine that embeds the geometry as an encoded
+    polyline string decoded in the browser, instead of a JSON array of floats. Like
+    folium.PolyLine, a list of point lists makes a single multi-polyline.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.polyline(
+                {%- if this.multi %}
+                {{ this.encoded_js }}.map(function (part) { return decodePolyline(part, {{ this.precision }}); }),
+                {%- else %}
+                decodePolyline({{ this.encoded_js }}, {{ this.precision }}),
+                {%- endif %}
+                {{ this.options|tojson }}
+            ).addTo({{this._parent.get_name()}});
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, locations, popup=None, tooltip=None, precision: int = 5, **kwargs):
+        super().__init__()
+        self._name = "PolyLine"
+        self.multi = bool(locations) and isinstance(locations[0][0], (list, tuple))
+        parts = locations if self.multi else [locations]
+        encoded = [encode_polyline(part, precision) for part in parts]
+        self.encoded = encoded if self.multi else encoded[0]
+        self.precision = precision
+        self.options = path_options(line=True, **kwargs)
+
+        lats = [p[0] for part in parts for p in part]
+        lons = [p[1] for part in parts for p in part]
+        self._bounds = [[min(lats), min(lons)], [max(lats), max(lons)]]
+
+        if popup is not None:
+            self.add_child(popup if isinstance(popup, Popup) else Popup(str(popup)))
+        if tooltip is not None:
+            self.add_child(tooltip if isinstance(tooltip, Tooltip) else Tooltip(str(tooltip)))
+
+    @property
+    def encoded_js(self) -> str:
+        """
+        The encoded string (or list of strings) as a JS literal. The alphabet contains '{', '}' and '#', and
+        branca compiles the macro output as a template again, so braces are escaped
+        to keep sequences like '{{' or '{#' from being read as template syntax.
+        """
+        return json.dumps(self.encoded).replace("{", "\\u007b").replace("}", "\\u007d")
+
+    def _get_self_bounds(self):
+        return self._bounds
+
+    def render(self, **kwargs):
+        # Same name every time, so the decoder is only included once per page
+        self.get_root().header.add_child(Element(DECODER_SCRIPT), name="decode_polyline")
+        super().render(**kwargs)
+
+
+if __name__ == "__main__":
+    import folium
+
+    # A short line whose encoding contains "{{", rendered without tripping branca
+    points = [[50.0, 19.9], [50.00974, 19.9], [50.01, 19.91]]
+    encoded = encode_polyline(points)
+    print(f"{len(points)} points encoded as {encoded!r}")
+    print(f"decoded: {decode_polyline(encoded)}")
+
+    m = folium.Map(location=points[0], zoom_start=14)
+    EncodedPolyLine(points, color="red", tooltip="encoded").add_to(m)
+    print(f"map page: {len(m.get_root().render()) / 1000:.1f} kB")
@@ -0,0 +1,52 @@
+from typing import Any, Callable, List, Tuple
+
+from src.base.route_features import SurfaceType, SteepnessType
+
+
+SURFACE_COLORS = {
+    SurfaceType.UNKNOWN: "#9e9e9e",
+    SurfaceType.PAVED: "#546e7a",
+    SurfaceType.ASPHALT: "#37474f",
+    SurfaceType.CONCRETE: "#78909c",
+    SurfaceType.PAVING_STONES: "#8d6e63",
+    SurfaceType.COBBLESTONE: "#6d4c41",
+    SurfaceType.METAL: "#607d8b",
+    SurfaceType.WOOD: "#a1887f",
+    SurfaceType.COMPACTED_GRAVEL: "#ffb300",
+    SurfaceType.FINE_GRAVEL: "#ffca28",
+    SurfaceType.GRAVEL: "#ff8f00",
+    SurfaceType.DIRT: "#a0522d",
+    SurfaceType.GROUND: "#8b5a2b",
+    SurfaceType.ICE: "#81d4fa",
+    SurfaceType.SAND: "#e6c229",
+    SurfaceType.WOODCHIPS: "#795548",
+    SurfaceType.GRASS: "#43a047",
+    SurfaceType.GRASS_PAVER: "#7cb342",
+}
+
+# Declines in blue, inclines in red, flat in green
+STEEPNESS_COLORS = {
+    SteepnessType.VERY_STEEP_DECLINE: "#0d47a1",
+    SteepnessType.STEEP_DECLINE: "#1565c0",
+    SteepnessType.MODERATE_DECLINE: "#1e88e5",
+    SteepnessType.SLIGHT_DECLINE: "#64b5f6",
+    SteepnessType.VERY_SLIGHT_DECLINE: "#a5d6a7",
+    SteepnessType.FLAT: "#43a047",
+    SteepnessType.VERY_SLIGHT_INCLINE: "#c0ca33",
+    SteepnessType.SLIGHT_INCLINE: "#fdd835",
+    SteepnessType.MODERATE_INCLINE: "#fb8c00",
+    SteepnessType.STEEP_INCLINE: "#e53935",
+    SteepnessType.VERY_STEEP_INCLINE: "#b71c1c",
+}
+
+
+def merge_runs(data: List[Tuple[int, int, Any]], key: Callable[[Any], Any] = lambda v: v) -> List[Tuple[int, int, Any]]:
+    """Merge adjacent (start, end, value) intervals whose values map to the same key"""
+    runs = []
+    for start, end, value in data:
+        k = key(value)
+        if runs and runs[-1][2] == k and runs[-1][1] == start:
+            runs[-1] = (runs[-1][0], end, k)
+        else:
+            runs.append((start, end, k))
+    return runs
@@ -0,0 +1,181 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.base.route import Route
+from src.visualize.styles import STEEPNESS_COLORS, merge_runs
+
+
+def _hex_to_rgb(color: str) -> Tuple[int, int, int]:
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def web_mercator(lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Project degrees to Web Mercator (unit sphere), y grows northwards"""
+    lat = np.clip(lat, -85.0511, 85.0511)
+    return np.radians(lon), np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """Encode a (height, width, 3) uint8 array as an RGB PNG"""
+    height, width, _ = pixels.shape
+    # Filter type 0 (None) in front of every scanline
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+class ThumbnailRenderer():
+    """
+    Draw routes as small static images without a browser, tile server or network:
+    the geometry is projected to Web Mercator and fitted to its bbox, then
+    written as SVG or rasterized with NumPy into a PNG.
+    """
+
+    def __init__(self, width=256, height=256, padding=12, line_width=3, color="#1e88e5",
+                 background="#ffffff", by_steepness=False, supersample=2):
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.line_width = line_width
+        self.color = color
+        self.background = background
+        self.by_steepness = by_steepness
+        self.supersample = supersample
+
+    def _project(self, route: Route, scale: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        coords = np.asarray(route.route_coords, dtype=float)
+        x, y = web_mercator(coords[:, 0], coords[:, 1])
+
+        # Fit to the projected bbox of the geometry
+        x0, x1, y0, y1 = x.min(), x.max(), y.min(), y.max()
+
+        width, height, padding = self.width * scale, self.height * scale, self.padding * scale
+        span = max(x1 - x0, y1 - y0, 1e-12)
+        factor = min(width - 2 * padding, height - 2 * padding) / span
+        # Center the route in the image, flip y since pixel rows grow downwards
+        px = (x - (x0 + x1) / 2) * factor + width / 2
+        py = height / 2 - (y - (y0 + y1) / 2) * factor
+        return px, py
+
+    def _runs(self, route: Route) -> List[Tuple[int, int, str]]:
+        n = len(route.route_coords)
+        if self.by_steepness and route.steepness is not None and route.steepness.data:
+            return [(start, end, STEEPNESS_COLORS[value]) for start, end, value in merge_runs(route.steepness.data)]
+        return [(0, n - 1, self.color)]
+
+    def to_svg(self, route: Route) -> str:
+        px, py = self._project(route)
+        paths = []
+        for start, end, color in self._runs(route):
+            d = "M" + "L".join(f"{x:.1f} {y:.1f}" for x, y in zip(px[start:end + 1], py[start:end + 1]))
+            paths.append(f'<path d="{d}" stroke="{color}"/>')
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+            f'viewBox="0 0 {self.width} {self.height}">'
+            f'<rect width="100%" height="100%" fill="{self.background}"/>'
+            f'<g fill="none" stroke-width="{self.line_width}" stroke-linecap="round" stroke-linejoin="round">'
+            + "".join(paths)
+            + "</g></svg>"
+        )
+
+    def to_pixels(self, route: Route) -> np.ndarray:
+        """Rasterize to a (height, width, 3) uint8 array, supersampled then box-filtered"""
+        s = self.supersample
+        width, height = self.width * s, self.height * s
+        canvas = np.empty((height, width, 3), dtype=np.uint8)
+        canvas[:] = _hex_to_rgb(self.background)
+
+        px, py = self._project(route, scale=s)
+        radius = max(self.line_width * s / 2, 0.5)
+        r = int(np.ceil(radius))
+        oy, ox = np.mgrid[-r:r + 1, -r:r + 1]
+        inside = ox ** 2 + oy ** 2 <= radius ** 2
+        ox, oy = ox[inside], oy[inside]
+
+        for start, end, color in self._runs(route):
+            x, y = px[start:end + 1], py[start:end + 1]
+            if len(x) == 1:
+                sx, sy = x, y
+            else:
+                # Sample each edge every half pixel, then stamp a disk on every sample
+                steps = np.maximum(np.ceil(np.hypot(np.diff(x), np.diff(y)) * 2).astype(int), 1)
+                edge = np.repeat(np.arange(len(steps)), steps)
+                t = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps, steps)
+                sx = np.append(x[edge] + np.diff(x)[edge] * t, x[-1])
+                sy = np.append(y[edge] + np.diff(y)[edge] * t, y[-1])
+
+            cols = (np.rint(sx).astype(int)[:, None] + ox[None, :]).ravel()
+            rows = (np.rint(sy).astype(int)[:, None] + oy[None, :]).ravel()
+            keep = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+            canvas[rows[keep], cols[keep]] = _hex_to_rgb(color)
+
+        if s > 1:
+            # Box filter: sum the s*s sub-grids with strided slices, much faster than a mean over axes
+            acc = np.zeros((self.height, self.width, 3), dtype=np.uint16)
+            for i in range(s):
+                for j in range(s):
+                    acc += canvas[i::s, j::s]
+            canvas = (acc // (s * s)).astype(np.uint8)
+        return canvas
+
+    def to_png(self, route: Route) -> bytes:
+        return encode_png(self.to_pixels(route))
+
+    def save(self, route: Route, filename: str) -> None:
+        """Format is taken from the extension (.svg or .png)"""
+        if filename.endswith(".svg"):
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(self.to_svg(route))
+        elif filename.endswith(".png"):
+            with open(filename, "wb") as f:
+                f.write(self.to_png(route))
+        else:
+            raise ValueError(f"Unsupported thumbnail format: {filename}")
+
+
+def _render_chunk(chunk, out_dir, fmt, renderer):
+    paths = []
+    for route_id, feature in chunk:
+        path = os.path.join(out_dir, f"{route_id}.{fmt}")
+        renderer.save(Route(feature), path)
+        paths.append(path)
+    return paths
+
+
+def render_thumbnails(routes, out_dir="out/thumbnails", fmt="png", renderer: Optional[ThumbnailRenderer] = None,
+                      max_workers=None, chunk_size=256) -> List[str]:
+    """
+    Render a thumbnail per route (mapping or iterable of route_id -> Route or ORS
+    feature) on a process pool. Returns the written paths.
+    """
+    if fmt not in ("png", "svg"):
+        raise ValueError(f"Unsupported thumbnail format: {fmt}")
+    renderer = renderer or ThumbnailRenderer()
+    os.makedirs(out_dir, exist_ok=True)
+
+    items = routes.items() if isinstance(routes, dict) else routes
+    pending = [(str(i), r.json_data if isinstance(r, Route) else r) for i, r in items]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    paths = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for chunk_paths in pool.map(_render_chunk, chunks, [out_dir] * len(chunks),
+                                    [fmt] * len(chunks), [renderer] * len(chunks)):
+            paths.extend(chunk_paths)
+    return paths
@@ -1,15 +1,64 @@
 import folium
+import re
+import urllib.request
+from urllib.parse import urljoin
 from src.base.route import Route
-from typing import Optional
+from src.visualize.polyline import EncodedPolyLine
+from src.visualize.styles import SURFACE_COLORS, STEEPNESS_COLORS, merge_runs
+from src.telemetry import tracing
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 
+
+_SCRIPT_TAG = re.compile(r'<script src="(https?://[^"]+)"></script>')
+_STYLESHEET_TAG = re.compile(r'<link rel="stylesheet" href="(https?://[^"]+)"/>')
+_CSS_URL = re.compile(r'url\((["\']?)(?!data:|https?:|#)([^)"\']+)\1\)')
+
+# Downloaded JS/CSS assets, shared by every map saved in this process
+_ASSET_CACHE: Dict[str, str] = {}
+
+
+def _fetch_asset(url: str) -> str:
+    if url not in _ASSET_CACHE:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            _ASSET_CACHE[url] = response.read().decode("utf-8")
+    return _ASSET_CACHE[url]
+
+
+def inline_assets(html: str) -> str:
+    """
+    Replace external <script>/<link> tags of a rendered page by the downloaded
+    sources, so the page works without CDN access. Relative url() references in
+    stylesheets (icons, fonts) are made absolute since they can't be resolved
+    against the local file.
+    """
+    def script(match):
+        source = _fetch_asset(match.group(1)).replace("</script", "<\\/script")
+        return f"<script>{source}</script>"
+
+    def stylesheet(match):
+        url = match.group(1)
+        css = _CSS_URL.sub(lambda m: f'url("{urljoin(url, m.group(2))}")', _fetch_asset(url))
+        return f"<style>{css}</style>"
+
+    html = _SCRIPT_TAG.sub(script, html)
+    return _STYLESHEET_TAG.sub(stylesheet, html)
+
+
 class RouteVisualizer:
     
-    def __init__(self, route: Route):
+    def __init__(self, route: Route, compact: bool = False):
+        """
+        compact: embed geometry as encoded polylines (decoded in the browser) instead of
+        JSON float arrays, which makes pages for long routes several times smaller.
+        """
         self.route = route
+        self.compact = compact
+        self._polyline = EncodedPolyLine if compact else folium.PolyLine
         self._map = None
         
-    def create_map(self, zoom_start: int = 14) -> folium.Map:
+    @tracing.traced("visualizer.create_map")
+    def create_map(self, zoom_start: int = 14, segments: bool = False) -> folium.Map:
 
         if not self.route.route_coords:
             raise ValueError("Route has no coordinates")
@@ -24,7 +73,7 @@ class RouteVisualizer:
         )
         
         # Add the route line
-        folium.PolyLine(
+        self._polyline(
             points,
             color="blue",
             weight=2.5,
@@ -47,6 +96,9 @@ class RouteVisualizer:
         
         self.add_features()
 
+        if segments:
+            self.add_segments()
+
         return self._map
     
     def add_features(self) -> None:
@@ -76,11 +128,65 @@ class RouteVisualizer:
                 fill=False,
             ).add_to(self._map)
     
-    def save(self, filename: Optional[str] = "out/map.html") -> None:
+    def add_segments(self, show: bool = False) -> None:
+        """
+        Adds surface and steepness overlays as toggleable layers. The intervals of
+        each value are drawn as a single multi-PolyLine, so a layer holds one object
+        per distinct value rather than one per interval.
+        """
+        if not self._map:
+            raise ValueError("Create map first using create_map()")
+
+        points = [[lat, lon] for lon, lat, *_ in self.route.route_coords]
+
+        layers = [
+            ("Surface", self.route.surface, SURFACE_COLORS),
+            ("Steepness", self.route.steepness, STEEPNESS_COLORS),
+        ]
+        added = False
+        for name, feature, colors in layers:
+            if feature is None or not feature.data:
+                continue
+
+            parts: Dict[Any, List[list]] = {}
+            for start, end, value in merge_runs(feature.data):
+                parts.setdefault(value, []).append(points[start:end + 1])
+
+            group = folium.FeatureGroup(name=name, show=show)
+            for value, lines in parts.items():
+                self._polyline(
+                    lines,
+                    color=colors[value],
+                    weight=5,
+                    opacity=0.9,
+                    tooltip=str(value),
+                ).add_to(group)
+            group.add_to(self._map)
+            added = True
+
+        if added:
+            folium.LayerControl(collapsed=False).add_to(self._map)
+
+    @tracing.traced("visualizer.render")
+    def to_html(self, inline: bool = False) -> str:
+        """inline: embed the Leaflet/folium JS and CSS in the page for offline use"""
+
+        if not self._map:
+            raise ValueError("Create map first using create_map()")
+
+        html = self._map.get_root().render()
+        return inline_assets(html) if inline else html
+
+    @tracing.traced("visualizer.save")
+    def save(self, filename: Optional[str] = "out/map.html", inline: bool = False) -> None:
 
         if not self._map:
             raise ValueError("Create map first using create_map()")
             
+        if not inline:
+            # Save map
+            self._map.save(filename)
+            return
 
-        # Save map
-        self._map.save(filename)
\ No newline at end of file
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(self.to_html(inline=True))
\ No newline at end of file